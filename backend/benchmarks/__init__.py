@@ -0,0 +1,8 @@
+"""Микробенчмарки горячих путей backend.
+
+Запуск из директории backend:
+
+    python -m benchmarks run --sizes 100,1000 --output bench.json
+    python -m benchmarks run --save-baseline
+    python -m benchmarks compare bench.json --threshold 0.15
+"""
@@ -0,0 +1,127 @@
+"""CLI бенчмарков: run и compare"""
+import argparse
+import fnmatch
+import os
+import sys
+import tempfile
+
+from benchmarks import runner
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _sizes(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def run_command(args):
+    from benchmarks.cases import CASES, BenchContext, new_event_loop
+    from benchmarks.seed import create_bench_engine, seed
+
+    loop = new_event_loop()
+    tmp_dir = tempfile.mkdtemp(prefix="todo-bench-")
+    results = []
+    selected = [c for c in CASES if fnmatch.fnmatch(c["name"], args.filter)]
+
+    for size in args.sizes:
+        # Отдельная БД на каждый размер, чтобы данные не смешивались
+        engine = create_bench_engine(
+            args.database_url or f"sqlite:///{os.path.join(tmp_dir, f'bench_{size}.db')}"
+        )
+        user_ids = seed(engine, users=args.users, tasks_per_user=size, seed=args.seed)
+        ctx = BenchContext(engine, user_ids, loop)
+        try:
+            for case in selected:
+                sized_by = case["sized_by"]
+                if sized_by == "endpoints":
+                    continue
+                if sized_by is None and size != args.sizes[0]:
+                    continue
+                params = {sized_by: size} if sized_by else {}
+                _run_case(case, ctx, size, params, args, results)
+        finally:
+            ctx.close()
+            engine.dispose()
+
+    ctx = BenchContext(None, [], loop)
+    for case in selected:
+        if case["sized_by"] == "endpoints":
+            for endpoints in args.label_sets:
+                _run_case(case, ctx, endpoints, {"endpoints": endpoints}, args, results)
+
+    report = runner.build_report(results, {
+        "sizes": args.sizes,
+        "users": args.users,
+        "seed": args.seed,
+        "rounds": args.rounds,
+    })
+    if args.output:
+        runner.save_report(report, args.output)
+        print(f"Результаты сохранены в {args.output}")
+    if args.save_baseline:
+        runner.save_report(report, args.baseline)
+        print(f"Baseline сохранен в {args.baseline}")
+    return 0
+
+
+def _run_case(case, ctx, size, params, args, results):
+    try:
+        fn = case["setup"](ctx, size)
+    except Exception as e:
+        print(f"SKIP {case['name']} {params}: {type(e).__name__}: {e}", file=sys.stderr)
+        return
+    stats = runner.measure(fn, rounds=args.rounds)
+    result = {"name": case["name"], "params": params, **stats}
+    results.append(result)
+    print(f"{runner.result_key(result):<50} median={runner.format_seconds(stats['median']):>12} "
+          f"p95={runner.format_seconds(stats['p95']):>12}")
+
+
+def compare_command(args):
+    current = runner.load_report(args.results)
+    baseline = runner.load_report(args.baseline)
+    rows = runner.compare(current, baseline, threshold=args.threshold)
+    regressions = 0
+    for row in rows:
+        if row["status"] == "new":
+            print(f"NEW         {row['key']:<50} {runner.format_seconds(row['current'])}")
+            continue
+        print(f"{row['status'].upper():<11} {row['key']:<50} "
+              f"{runner.format_seconds(row['baseline']):>12} -> {runner.format_seconds(row['current']):>12} "
+              f"({(row['ratio'] - 1) * 100:+.1f}%)")
+        regressions += row["status"] == "regression"
+    if regressions:
+        print(f"\nНайдено регрессий: {regressions} (порог {args.threshold:.0%})")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Бенчмарки горячих путей backend")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Запустить бенчмарки")
+    run.add_argument("--sizes", type=_sizes, default=[100, 1000], help="Задач на пользователя / строк, через запятую")
+    run.add_argument("--label-sets", type=_sizes, default=[10, 50], help="Число endpoint'ов в метриках")
+    run.add_argument("--users", type=int, default=20)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--rounds", type=int, default=20)
+    run.add_argument("--filter", default="*", help="Маска имени кейса, например 'tasks.*'")
+    run.add_argument("--database-url", help="БД для сидинга (по умолчанию временный SQLite)")
+    run.add_argument("--output", help="Куда сохранить JSON с результатами")
+    run.add_argument("--save-baseline", action="store_true")
+    run.add_argument("--baseline", default=DEFAULT_BASELINE)
+    run.set_defaults(func=run_command)
+
+    cmp = sub.add_parser("compare", help="Сравнить результаты с baseline")
+    cmp.add_argument("results")
+    cmp.add_argument("--baseline", default=DEFAULT_BASELINE)
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Допустимое замедление медианы (доля)")
+    cmp.set_defaults(func=compare_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
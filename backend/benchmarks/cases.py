@@ -0,0 +1,192 @@
+"""Бенчмарки функций, через которые проходит каждый запрос.
+
+Каждый кейс получает контекст с сиданной БД и возвращает функцию
+без аргументов, время вызова которой и измеряется.
+"""
+import asyncio
+from typing import List
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm import sessionmaker
+
+from models import Task
+from benchmarks.seed import user_email
+
+CASES = []
+
+
+def benchmark(name: str, sized_by: str = None):
+    """Регистрирует кейс; sized_by - имя параметра размера данных"""
+    def decorator(setup):
+        CASES.append({"name": name, "sized_by": sized_by, "setup": setup})
+        return setup
+    return decorator
+
+
+class BenchContext:
+    """Общие ресурсы кейсов для одного размера данных"""
+
+    def __init__(self, engine, user_ids, loop):
+        self.engine = engine
+        self.user_ids = user_ids
+        self.loop = loop
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self._sessions = []
+
+    def session(self):
+        db = self.Session()
+        self._sessions.append(db)
+        return db
+
+    def user(self, db):
+        from models import User
+        return db.get(User, self.user_ids[0])
+
+    def close(self):
+        for db in self._sessions:
+            db.close()
+
+
+# ========== АУТЕНТИФИКАЦИЯ ==========
+@benchmark("security.create_access_token")
+def bench_create_access_token(ctx, size):
+    from core.security import create_access_token
+    return lambda: create_access_token(data={"sub": user_email(0)})
+
+
+@benchmark("security.verify_token")
+def bench_verify_token(ctx, size):
+    from core.security import create_access_token, verify_token
+    token = create_access_token(data={"sub": user_email(0)})
+    return lambda: verify_token(token)
+
+
+@benchmark("users.get_current_user", sized_by="tasks_per_user")
+def bench_get_current_user(ctx, size):
+    from core.security import create_access_token
+    from routers.users import get_current_user
+    credentials = HTTPAuthorizationCredentials(
+        scheme="Bearer",
+        credentials=create_access_token(data={"sub": user_email(0)})
+    )
+    db = ctx.session()
+
+    def run():
+        # Сбрасываем identity map, иначе повторные вызовы не ходят в БД
+        db.expunge_all()
+        return ctx.loop.run_until_complete(get_current_user(credentials, db))
+    return run
+
+
+# ========== СЕРИАЛИЗАЦИЯ ==========
+@benchmark("schemas.task_response", sized_by="rows")
+def bench_task_response(ctx, size):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from schemas import TaskResponse
+
+    # Тот же путь, что проходит ответ get_tasks с response_model
+    field = create_response_field(name="Response_get_tasks", type_=List[TaskResponse])
+    db = ctx.session()
+    rows = db.query(Task).limit(size).all()
+
+    def run():
+        content = ctx.loop.run_until_complete(
+            serialize_response(field=field, response_content=rows, is_coroutine=False)
+        )
+        return JSONResponse(content).body
+    return run
+
+
+# ========== MIDDLEWARE И МЕТРИКИ ==========
+@benchmark("main.log_requests")
+def bench_log_requests(ctx, size):
+    import logging
+    import os
+    from fastapi import Request
+    from fastapi.responses import Response
+    import main
+
+    # Консольный вывод глушим, файловые обработчики остаются как в проде
+    main.setup_logging()
+    for handler in logging.getLogger("todo-app").handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setStream(open(os.devnull, "w"))
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/tasks/",
+        "raw_path": b"/tasks/",
+        "query_string": b"completed=false",
+        "headers": [(b"host", b"localhost:8000"), (b"user-agent", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+        "scheme": "http",
+        "root_path": "",
+    }
+
+    async def call_next(request):
+        return Response(b"[]", media_type="application/json")
+
+    return lambda: ctx.loop.run_until_complete(main.log_requests(Request(scope), call_next))
+
+
+@benchmark("metrics.generate_latest", sized_by="endpoints")
+def bench_generate_latest(ctx, size):
+    from prometheus_client import generate_latest, REGISTRY
+    from metrics import REQUEST_COUNT, REQUEST_LATENCY
+
+    # Реалистичный набор меток: endpoint x method x status_code
+    for i in range(size):
+        endpoint = f"/bench/{i}"
+        for method in ("GET", "POST", "PUT", "DELETE"):
+            REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(0.05)
+            for status_code in (200, 401, 404, 500):
+                REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+    return lambda: generate_latest(REGISTRY)
+
+
+# ========== ЗАПРОСЫ К БД ==========
+def uncached_request(path: str):
+    """Request для обработчика с кешем ответов; кеш отключается, чтобы каждый
+    вызов доходил до БД, а не отдавал байты из response_cache"""
+    from fastapi import Request
+    from core.cache import NullCache, response_cache
+
+    response_cache.backend = NullCache()
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+    })
+
+
+@benchmark("tasks.get_tasks", sized_by="tasks_per_user")
+def bench_get_tasks(ctx, size):
+    from routers.tasks import get_tasks
+    db = ctx.session()
+    user = ctx.user(db)
+    request = uncached_request("/tasks/")
+
+    def run():
+        db.expunge_all()
+        return get_tasks(request, completed=None, category_id=None, current_user=user, db=db)
+    return run
+
+
+@benchmark("tasks.get_stats", sized_by="tasks_per_user")
+def bench_get_stats(ctx, size):
+    from routers.tasks import get_stats
+    db = ctx.session()
+    user = ctx.user(db)
+    request = uncached_request("/tasks/stats")
+    return lambda: get_stats(request, current_user=user, db=db)
+
+
+def new_event_loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop
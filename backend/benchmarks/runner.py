@@ -0,0 +1,121 @@
+"""Замер времени, сохранение результатов и сравнение с baseline"""
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+# Минимальная длительность одного раунда: короткие операции
+# повторяются внутри раунда, чтобы не мерить шум таймера
+MIN_ROUND_TIME = 0.02
+
+
+def _calibrate(fn) -> int:
+    """Подбирает число вызовов на раунд"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_TIME or number >= 1_000_000:
+            return number
+        number *= 2 if elapsed > MIN_ROUND_TIME / 10 else 10
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(fn, rounds: int = 20, warmup: int = 2) -> dict:
+    """Измеряет время одного вызова fn в секундах"""
+    for _ in range(warmup):
+        fn()
+    number = _calibrate(fn)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    median = statistics.median(samples)
+    return {
+        "rounds": rounds,
+        "iterations": number,
+        "min": min(samples),
+        "median": median,
+        "mean": statistics.fmean(samples),
+        "p95": _percentile(samples, 95),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_sec": 1 / median if median else 0.0,
+    }
+
+
+def result_key(result: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def build_report(results: list, options: dict) -> dict:
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "options": options,
+        },
+        "results": results,
+    }
+
+
+def save_report(report: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.10) -> list:
+    """Сравнивает медианы с baseline.
+
+    Возвращает строки сравнения; регрессией считается замедление
+    больше чем на threshold (доля от baseline).
+    """
+    baseline_by_key = {result_key(r): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = result_key(result)
+        base = baseline_by_key.get(key)
+        if base is None:
+            rows.append({"key": key, "status": "new", "current": result["median"]})
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else 1.0
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({
+            "key": key,
+            "status": status,
+            "baseline": base["median"],
+            "current": result["median"],
+            "ratio": ratio,
+        })
+    return rows
+
+
+def format_seconds(value: float) -> str:
+    if value >= 1:
+        return f"{value:.3f} s"
+    if value >= 1e-3:
+        return f"{value * 1e3:.3f} ms"
+    return f"{value * 1e6:.2f} us"
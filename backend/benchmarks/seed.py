@@ -0,0 +1,105 @@
+"""Детерминированное наполнение БД данными для бенчмарков"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User, Task, Category, PRIORITY_RANKS
+
+# Фиксированная точка отсчёта, чтобы даты не зависели от момента запуска
+BASE_TIME = datetime(2024, 1, 1)
+PRIORITIES = ["low", "medium", "high"]
+# Пароль пользователям не нужен: get_current_user его не проверяет
+PLACEHOLDER_HASH = "$2b$12$" + "x" * 53
+CHUNK_SIZE = 1000
+
+
+def user_email(index: int, prefix: str = "bench-user") -> str:
+    return f"{prefix}-{index}@example.com"
+
+
+def create_bench_engine(database_url: str):
+    """Создает движок и схему для отдельной бенчмарк-БД"""
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _bulk_insert(session, model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        session.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def seed(engine, users: int, tasks_per_user: int, categories_per_user: int = 5, seed: int = 42,
+         hashed_password: str = PLACEHOLDER_HASH, email_prefix: str = "bench-user"):
+    """Заполняет БД одинаковыми при каждом запуске данными.
+
+    Возвращает список id созданных пользователей.
+    """
+    rng = random.Random(seed)
+    session = sessionmaker(bind=engine)()
+    try:
+        user_rows = [
+            {
+                "email": user_email(i, email_prefix),
+                "hashed_password": hashed_password,
+                "created_at": BASE_TIME,
+                "is_active": True,
+            }
+            for i in range(users)
+        ]
+        _bulk_insert(session, User, user_rows)
+        session.flush()
+        user_ids = [
+            row.id for row in session.query(User.id).filter(
+                User.email.in_([r["email"] for r in user_rows])
+            ).order_by(User.id)
+        ]
+
+        category_rows = [
+            {
+                "name": f"category-{c}",
+                "color": "#667eea",
+                "user_id": user_id,
+                "created_at": BASE_TIME,
+            }
+            for user_id in user_ids
+            for c in range(categories_per_user)
+        ]
+        _bulk_insert(session, Category, category_rows)
+        session.flush()
+        categories_by_user = {}
+        for category in session.query(Category.id, Category.user_id).filter(
+            Category.user_id.in_(user_ids)
+        ):
+            categories_by_user.setdefault(category.user_id, []).append(category.id)
+
+        task_rows = []
+        for user_id in user_ids:
+            user_categories = categories_by_user.get(user_id, [])
+            for t in range(tasks_per_user):
+                created = BASE_TIME + timedelta(minutes=rng.randrange(0, 60 * 24 * 365))
+                priority = rng.choice(PRIORITIES)
+                task_rows.append({
+                    "title": f"task-{t}",
+                    "description": "x" * rng.randrange(0, 200),
+                    "completed": rng.random() < 0.4,
+                    "created_at": created,
+                    "updated_at": created + timedelta(hours=rng.randrange(0, 72)),
+                    "due_date": created + timedelta(days=rng.randrange(1, 30)) if rng.random() < 0.5 else None,
+                    "priority": priority,
+                    "priority_rank": PRIORITY_RANKS[priority],
+                    "user_id": user_id,
+                    "category_id": rng.choice(user_categories) if user_categories and rng.random() < 0.7 else None,
+                })
+            if len(task_rows) >= CHUNK_SIZE * 10:
+                _bulk_insert(session, Task, task_rows)
+                task_rows = []
+        _bulk_insert(session, Task, task_rows)
+
+        session.commit()
+        return user_ids
+    finally:
+        session.close()
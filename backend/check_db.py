@@ -1,25 +1,397 @@
-from models import SessionLocal, User, Task, Category
+"""Обслуживание и просмотр БД.
 
-def check_database():
-    db = SessionLocal()
-    try:
-        print("=== ПОЛЬЗОВАТЕЛИ ===")
-        users = db.query(User).all()
-        for user in users:
-            print(f"ID: {user.id}, Email: {user.email}, Created: {user.created_at}")
+    python check_db.py show tasks --user-id 42 --page-size 500
+    python check_db.py stats [--exact]
+    python check_db.py indexes [--user-id 42]
+    python check_db.py analyze | vacuum [--full] | checkpoint [--mode PASSIVE] | integrity
 
-        print("\n=== ЗАДАЧИ ===")
-        tasks = db.query(Task).all()
-        for task in tasks:
-            print(f"ID: {task.id}, Title: {task.title}, User: {task.user_id}, Completed: {task.completed}")
+--shard N выполняет команду на шарде N вместо основной БД.
 
-        print("\n=== КАТЕГОРИИ ===")
-        categories = db.query(Category).all()
-        for category in categories:
-            print(f"ID: {category.id}, Name: {category.name}, User: {category.user_id}")
+Все обходы идут по первичному ключу пачками, а обслуживание - по одной
+таблице за короткую транзакцию с паузой между ними, так что команды
+можно запускать на рабочей БД, не блокируя запись надолго.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import false, func, inspect, select, text
+from sqlalchemy.sql.util import find_tables
+
+from models import (
+    ArchivedTask, Base, Category, RefreshToken, RevokedToken, Task, User, UserShard,
+    engine, shard_engines
+)
+
+# Что выводит show для каждой таблицы
+SHOW_COLUMNS = {
+    "users": (User, ["id", "email", "created_at", "is_active"]),
+    "tasks": (Task, ["id", "title", "user_id", "completed", "due_date", "priority"]),
+    "categories": (Category, ["id", "name", "user_id"]),
+    "archived_tasks": (ArchivedTask, ["id", "task_id", "title", "user_id", "archived_at"]),
+}
+
+DEFAULT_PAUSE = 0.1
+
+
+# ========== ПРОСМОТР ==========
+def show(target, table: str, user_id: int = None, after_id: int = 0,
+         page_size: int = 100, limit: int = None):
+    """Построчный вывод таблицы страницами по id, без загрузки всей таблицы в память"""
+    model, columns = SHOW_COLUMNS[table]
+    fields = [getattr(model, name) for name in columns]
+    printed = 0
+    last_id = after_id
+    while limit is None or printed < limit:
+        size = page_size if limit is None else min(page_size, limit - printed)
+        query = select(*fields).where(model.id > last_id).order_by(model.id).limit(size)
+        if user_id is not None and table != "users":
+            query = query.where(model.user_id == user_id)
+        with target.connect() as conn:
+            rows = conn.execute(query).all()
+        for row in rows:
+            print(", ".join(f"{name}: {value}" for name, value in zip(columns, row)))
+        printed += len(rows)
+        if rows:
+            last_id = rows[-1].id
+        if len(rows) < size:
+            break
+    # Для продолжения: --after-id <последний id>
+    print(f"-- {printed} rows, last id: {last_id}", file=sys.stderr)
+
+
+# ========== РАЗМЕРЫ ==========
+def table_sizes(target) -> dict:
+    """Размер таблиц с индексами в байтах; пусто, если СУБД его не отдает"""
+    with target.connect() as conn:
+        if target.dialect.name == "postgresql":
+            return {
+                name: conn.execute(text("SELECT pg_total_relation_size(:t)"), {"t": name}).scalar()
+                for name in Base.metadata.tables
+            }
+        if target.dialect.name == "sqlite":
+            try:
+                rows = conn.execute(text("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')")).all()
+                owner = {name: table for name, table in rows}
+                sizes = {}
+                for name, size in conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")):
+                    table = owner.get(name, name)
+                    sizes[table] = sizes.get(table, 0) + size
+                return sizes
+            except Exception:
+                # SQLite собран без dbstat
+                return {}
+    return {}
+
+
+def row_count(target, table: str, exact: bool) -> int:
+    with target.connect() as conn:
+        if target.dialect.name == "postgresql" and not exact:
+            # COUNT(*) по большой таблице в Postgres - полный проход, берем оценку планировщика
+            return int(conn.execute(
+                text("SELECT reltuples FROM pg_class WHERE relname = :t"), {"t": table}
+            ).scalar() or 0)
+        return conn.execute(select(func.count()).select_from(Base.metadata.tables[table])).scalar()
+
+
+def stats(target, exact: bool = False):
+    existing = set(inspect(target).get_table_names())
+    sizes = table_sizes(target)
+    print(f"{'table':<20} {'rows':>12} {'size':>12}")
+    for table in Base.metadata.tables:
+        if table not in existing:
+            continue
+        size = sizes.get(table)
+        size = f"{size / 1024:.1f} KB" if size is not None else "-"
+        print(f"{table:<20} {row_count(target, table, exact):>12} {size:>12}")
+    if target.dialect.name == "sqlite":
+        with target.connect() as conn:
+            page_size = conn.execute(text("PRAGMA page_size")).scalar()
+            pages = conn.execute(text("PRAGMA page_count")).scalar()
+            free = conn.execute(text("PRAGMA freelist_count")).scalar()
+        print(f"file: {pages * page_size / 1024:.1f} KB, free pages: {free}")
+
+
+# ========== ИНДЕКСЫ ==========
+def router_queries(user_id: int) -> dict:
+    """Запросы, которые выполняют роутеры, в том же виде (без ORM-сессии)"""
+    now = datetime.utcnow()
+    agenda = select(Task).where(
+        Task.user_id == user_id, Task.completed == false(), Task.due_date.isnot(None)
+    )
+    return {
+        # routers/users.py: get_current_user
+        "current_user": select(User).where(User.email == "user@example.com"),
+        "current_user_shard": select(User, UserShard).outerjoin(
+            UserShard, UserShard.user_id == User.id
+        ).where(User.email == "user@example.com"),
+        # routers/tasks.py
+        "tasks.list": select(Task).where(Task.user_id == user_id),
+        "tasks.list_completed": select(Task).where(Task.user_id == user_id, Task.completed == True),  # noqa: E712
+        "tasks.list_category": select(Task).where(Task.user_id == user_id, Task.category_id == 1),
+        "tasks.get": select(Task).where(Task.id == 1, Task.user_id == user_id),
+        "tasks.stats_total": select(func.count()).select_from(Task).where(Task.user_id == user_id),
+        "tasks.stats_completed": select(func.count()).select_from(Task).where(
+            Task.user_id == user_id, Task.completed == True  # noqa: E712
+        ),
+        "tasks.stats_archived": select(func.count()).select_from(ArchivedTask).where(
+            ArchivedTask.user_id == user_id
+        ),
+        "tasks.upcoming": agenda.where(
+            Task.due_date >= now, Task.due_date < now + timedelta(days=7)
+        ).order_by(Task.due_date, Task.priority_rank.desc()).limit(50),
+        "tasks.overdue": agenda.where(Task.due_date < now).order_by(
+            Task.due_date, Task.priority_rank.desc()
+        ).limit(50),
+        "tasks.archive": select(ArchivedTask).where(ArchivedTask.user_id == user_id).order_by(
+            ArchivedTask.archived_at.desc(), ArchivedTask.id.desc()
+        ).limit(50),
+        # routers/categories.py
+        "categories.list": select(Category).where(Category.user_id == user_id),
+        # core/sessions.py, core/revocation.py
+        "sessions.refresh": select(RefreshToken).where(RefreshToken.token_hash == "0" * 64),
+        "sessions.list": select(RefreshToken).where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now
+        ).order_by(RefreshToken.created_at.desc()),
+        "revocation.check": select(RevokedToken).where(RevokedToken.jti == "0" * 32),
+    }
+
+
+def explain(conn, statement) -> list:
+    """Строки плана запроса"""
+    compiled = statement.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + compiled.string, params).all()]
+
+
+def plan_problems(dialect: str, plan: list) -> list:
+    problems = []
+    for line in plan:
+        if dialect == "sqlite":
+            # "SCAN tasks" без индекса - полный проход таблицы
+            if line.startswith("SCAN ") and " USING " not in line:
+                problems.append(f"full scan: {line}")
+            if "TEMP B-TREE" in line:
+                problems.append(f"sort without index: {line}")
+        elif "Seq Scan" in line:
+            problems.append(f"sequential scan: {line.strip()}")
+    return problems
+
+
+def index_report(target, user_id: int = 1):
+    inspector = inspect(target)
+    existing = set(inspector.get_table_names())
+    indexes = {
+        index["name"]: table
+        for table in existing
+        for index in inspector.get_indexes(table)
+    }
+    used = set()
+
+    print("=== ЗАПРОСЫ РОУТЕРОВ ===")
+    with target.connect() as conn:
+        for name, statement in router_queries(user_id).items():
+            tables = {table.name for table in find_tables(statement)}
+            if not tables <= existing:
+                continue
+            plan = explain(conn, statement)
+            used.update(index for index in indexes if any(index in line for line in plan))
+            problems = plan_problems(target.dialect.name, plan)
+            print(f"{'!!' if problems else 'ok'} {name}")
+            for problem in problems:
+                print(f"     {problem}")
+
+    print("\n=== ИНДЕКСЫ ===")
+    usage = {}
+    if target.dialect.name == "postgresql":
+        with target.connect() as conn:
+            usage = dict(conn.execute(text(
+                "SELECT indexrelname, idx_scan FROM pg_stat_user_indexes"
+            )).all())
+    for index, table in sorted(indexes.items(), key=lambda item: (item[1], item[0])):
+        scans = f", scans: {usage[index]}" if index in usage else ""
+        note = "used by router queries" if index in used else "not used by router queries"
+        print(f"{table}.{index}: {note}{scans}")
+    if target.dialect.name == "sqlite":
+        print("(SQLite has no index usage counters; small tables may be scanned even with an index)")
+    else:
+        print("(small tables may be scanned sequentially even with an index)")
+
+
+# ========== ОБСЛУЖИВАНИЕ ==========
+def _tables(target):
+    existing = set(inspect(target).get_table_names())
+    return [table for table in Base.metadata.tables if table in existing]
+
+
+def analyze(target, pause: float = DEFAULT_PAUSE):
+    """Статистика планировщика, по одной таблице за раз"""
+    for table in _tables(target):
+        started = time.perf_counter()
+        with target.begin() as conn:
+            conn.execute(text(f"ANALYZE {table}"))
+        print(f"analyzed {table} in {time.perf_counter() - started:.2f}s")
+        time.sleep(pause)
+
+
+def vacuum(target, full: bool = False, pages: int = 1000, pause: float = DEFAULT_PAUSE):
+    """Возврат свободного места.
+
+    SQLite: при auto_vacuum=INCREMENTAL - incremental_vacuum порциями по
+    pages страниц. Полный VACUUM переписывает весь файл и блокирует запись
+    на все время, поэтому только с --full.
+    Postgres: VACUUM по одной таблице (не блокирует чтение и запись);
+    --full - VACUUM FULL с эксклюзивной блокировкой таблицы.
+    """
+    if target.dialect.name == "sqlite":
+        with target.connect() as conn:
+            mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+            free = conn.execute(text("PRAGMA freelist_count")).scalar()
+        if full:
+            print(f"VACUUM ({free} free pages), writers are blocked until it finishes")
+            with target.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql("VACUUM")
+            return
+        if mode != 2:
+            print(f"auto_vacuum is not INCREMENTAL, {free} free pages; use --full to rewrite the file")
+            return
+        while free:
+            with target.begin() as conn:
+                conn.exec_driver_sql(f"PRAGMA incremental_vacuum({pages})").all()
+                free = conn.execute(text("PRAGMA freelist_count")).scalar()
+            print(f"incremental vacuum: {free} free pages left")
+            time.sleep(pause)
+        return
+
+    with target.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in _tables(target):
+            started = time.perf_counter()
+            conn.exec_driver_sql(f"VACUUM {'FULL ' if full else ''}{table}")
+            print(f"vacuumed {table} in {time.perf_counter() - started:.2f}s")
+            time.sleep(pause)
+
+
+def checkpoint(target, mode: str = "PASSIVE"):
+    """Перенос WAL в основной файл SQLite; PASSIVE не ждет читателей и писателей"""
+    if target.dialect.name != "sqlite":
+        print("checkpoint applies to SQLite WAL only")
+        return
+    with target.connect() as conn:
+        journal = conn.execute(text("PRAGMA journal_mode")).scalar()
+        if journal != "wal":
+            print(f"journal_mode is {journal}, nothing to checkpoint")
+            return
+        busy, log, done = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one()
+    print(f"checkpoint {mode}: busy={busy}, wal pages={log}, checkpointed={done}")
+
+
+def integrity(target, batch_size: int = 10000, pause: float = DEFAULT_PAUSE) -> bool:
+    """Проверка целостности: встроенная проверка SQLite по таблицам
+    и висячие внешние ключи пачками по id (для любой СУБД)"""
+    ok = True
+    tables = _tables(target)
+    if target.dialect.name == "sqlite":
+        for table in tables:
+            with target.connect() as conn:
+                result = [row[0] for row in conn.exec_driver_sql(f"PRAGMA integrity_check({table})")]
+            if result != ["ok"]:
+                ok = False
+                print(f"{table}: {'; '.join(result[:10])}")
+            time.sleep(pause)
+
+    for table_name in tables:
+        table = Base.metadata.tables[table_name]
+        key = list(table.primary_key.columns)[0]
+        for foreign_key in table.foreign_keys:
+            column, parent = foreign_key.parent, foreign_key.column
+            if parent.table.name not in tables:
+                continue
+            orphans = 0
+            last = None
+            while True:
+                batch = select(key).order_by(key).limit(batch_size)
+                if last is not None:
+                    batch = batch.where(key > last)
+                with target.connect() as conn:
+                    keys = conn.execute(batch).scalars().all()
+                    if not keys:
+                        break
+                    orphans += conn.execute(
+                        select(func.count()).select_from(table).where(
+                            key >= keys[0], key <= keys[-1],
+                            column.isnot(None),
+                            ~select(parent).where(parent == column).exists()
+                        )
+                    ).scalar()
+                last = keys[-1]
+                time.sleep(pause)
+            if orphans:
+                ok = False
+                print(f"{table_name}.{column.name}: {orphans} rows reference missing {parent.table.name}")
+    print("integrity ok" if ok else "integrity problems found")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python check_db.py", description="Обслуживание БД")
+    parser.add_argument("--shard", type=int, help="шард вместо основной БД")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = commands.add_parser("show", help="постраничный просмотр таблицы")
+    show_parser.add_argument("table", choices=sorted(SHOW_COLUMNS))
+    show_parser.add_argument("--user-id", type=int)
+    show_parser.add_argument("--after-id", type=int, default=0)
+    show_parser.add_argument("--page-size", type=int, default=100)
+    show_parser.add_argument("--limit", type=int)
+
+    stats_parser = commands.add_parser("stats", help="число строк и размер таблиц")
+    stats_parser.add_argument("--exact", action="store_true", help="точный COUNT(*) в Postgres")
+
+    indexes_parser = commands.add_parser("indexes", help="планы запросов роутеров и использование индексов")
+    indexes_parser.add_argument("--user-id", type=int, default=1)
+
+    analyze_parser = commands.add_parser("analyze", help="ANALYZE по таблицам")
+    analyze_parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE)
+
+    vacuum_parser = commands.add_parser("vacuum", help="возврат свободного места")
+    vacuum_parser.add_argument("--full", action="store_true", help="полный VACUUM, блокирует запись")
+    vacuum_parser.add_argument("--pages", type=int, default=1000)
+    vacuum_parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE)
+
+    checkpoint_parser = commands.add_parser("checkpoint", help="wal_checkpoint для SQLite")
+    checkpoint_parser.add_argument("--mode", default="PASSIVE", choices=["PASSIVE", "FULL", "RESTART", "TRUNCATE"])
+
+    integrity_parser = commands.add_parser("integrity", help="проверка целостности и внешних ключей")
+    integrity_parser.add_argument("--batch-size", type=int, default=10000)
+    integrity_parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE)
+
+    args = parser.parse_args(argv)
+    target = shard_engines[args.shard] if args.shard is not None else engine
+
+    if args.command == "show":
+        show(target, args.table, args.user_id, args.after_id, args.page_size, args.limit)
+    elif args.command == "stats":
+        stats(target, args.exact)
+    elif args.command == "indexes":
+        index_report(target, args.user_id)
+    elif args.command == "analyze":
+        analyze(target, args.pause)
+    elif args.command == "vacuum":
+        vacuum(target, args.full, args.pages, args.pause)
+    elif args.command == "checkpoint":
+        checkpoint(target, args.mode)
+    elif args.command == "integrity":
+        sys.exit(0 if integrity(target, args.batch_size, args.pause) else 1)
 
-    finally:
-        db.close()
 
 if __name__ == "__main__":
-    check_database()
\ No newline at end of file
+    main()
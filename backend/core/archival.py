@@ -0,0 +1,95 @@
+"""Архивация завершенных задач.
+
+Задачи, завершенные больше ARCHIVE_AFTER_DAYS дней назад, переносятся из
+tasks в archived_tasks, чтобы выборки по user_id в get_tasks/get_stats
+не росли вместе с историей. Перенос идет пачками по ARCHIVE_BATCH_SIZE,
+каждая пачка - своя короткая транзакция, между пачками пауза, так что
+запись в tasks надолго не блокируется.
+
+Разовый запуск: python -m core.archival
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, true
+
+from core.cache import response_cache
+from core.config import settings
+from metrics import TASKS_ARCHIVED
+from models import ArchivedTask, SessionLocal, ShardSessions, Task
+
+logger = logging.getLogger("todo-app")
+
+ARCHIVED_COLUMNS = [
+    "title", "description", "completed", "created_at", "updated_at",
+    "due_date", "priority", "priority_rank", "user_id", "category_id",
+]
+
+
+def archive_completed_tasks(older_than_days: int = None, batch_size: int = None,
+                            pause: float = None, session_factory=SessionLocal) -> int:
+    """Переносит старые завершенные задачи в архив, возвращает их число"""
+    older_than_days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    pause = settings.ARCHIVE_BATCH_PAUSE_SECONDS if pause is None else pause
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    archived = 0
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            # Идем по первичному ключу: каждая пачка читает ограниченный диапазон.
+            # SKIP LOCKED (где поддерживается) не дает двум воркерам взять одни строки
+            rows = db.query(Task.id, Task.user_id).filter(
+                Task.id > last_id,
+                Task.completed == true(),
+                func.coalesce(Task.updated_at, Task.created_at) < cutoff
+            ).order_by(Task.id).limit(batch_size).with_for_update(skip_locked=True).all()
+            if not rows:
+                break
+            ids = [row.id for row in rows]
+            last_id = ids[-1]
+
+            now = datetime.utcnow()
+            db.execute(insert(ArchivedTask).from_select(
+                ["task_id"] + ARCHIVED_COLUMNS + ["archived_at"],
+                select(Task.id, *[getattr(Task, name) for name in ARCHIVED_COLUMNS], literal(now))
+                .where(Task.id.in_(ids))
+            ))
+            db.execute(delete(Task).where(Task.id.in_(ids)))
+            db.commit()
+            archived += len(ids)
+            TASKS_ARCHIVED.inc(len(ids))
+            # Задачи ушли из tasks в архив - списки и статистика устарели
+            for user_id in {row.user_id for row in rows}:
+                response_cache.invalidate(user_id, "tasks", "dashboard")
+        finally:
+            db.close()
+
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return archived
+
+
+def archive_all_shards() -> int:
+    return sum(archive_completed_tasks(session_factory=factory) for factory in ShardSessions)
+
+
+async def run_archival():
+    """Фоновая задача: периодическая архивация"""
+    while True:
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+        try:
+            archived = await asyncio.to_thread(archive_all_shards)
+            if archived:
+                logger.info("Completed tasks archived", extra={"archived": archived})
+        except Exception as e:
+            logger.error(f"Task archival failed: {str(e)}", exc_info=True)
+
+
+if __name__ == "__main__":
+    print(f"Archived tasks: {archive_all_shards()}")
@@ -0,0 +1,287 @@
+"""Кеш ответов для чтения задач и категорий.
+
+Ключ - пользователь, пространство имен (tasks, categories) и путь с
+нормализованными query-параметрами; значение - готовые байты JSON.
+Записи пространства сбрасываются из путей записи (invalidate), а TTL
+ограничивает устаревание, если инвалидация не дошла.
+
+invalidate также увеличивает поколение пары (пользователь, пространство).
+Чтение запоминает поколение до запроса к БД, и put не кладет в кеш ответ,
+если за это время прошла запись: иначе чтение, начавшееся до записи,
+вернуло бы в кеш старые данные уже после инвалидации.
+
+Бэкенд memory живет в процессе и годится для одного воркера: запись,
+обработанная другим воркером, его не сбросит. Для нескольких воркеров
+нужен общий бэкенд redis.
+"""
+import logging
+import struct
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from core.config import settings
+from core.tracing import tracer
+from metrics import CACHE_REQUESTS, CACHE_HIT_RATIO, CACHE_BYTES, CACHE_ENTRIES, CACHE_EVICTIONS
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger("todo-app")
+
+
+class CacheBackend(ABC):
+    """Интерфейс хранилища"""
+
+    @abstractmethod
+    def get(self, user_id: int, namespace: str, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def generation(self, user_id: int, namespace: str) -> int:
+        """Счетчик инвалидаций пространства пользователя"""
+
+    @abstractmethod
+    def set(self, user_id: int, namespace: str, key: str, value: bytes, generation: int):
+        """Кладет value, только если поколение все еще равно generation"""
+
+    @abstractmethod
+    def invalidate(self, user_id: int, namespaces: Iterable[str]):
+        ...
+
+
+class NullCache(CacheBackend):
+    def get(self, user_id, namespace, key):
+        return None
+
+    def generation(self, user_id, namespace):
+        return 0
+
+    def set(self, user_id, namespace, key, value, generation):
+        pass
+
+    def invalidate(self, user_id, namespaces):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """LRU в памяти процесса с бюджетом по байтам и TTL"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (user_id, namespace, key) -> (expires_at, value)
+        self._groups = {}  # (user_id, namespace) -> set ключей
+        self._generations = {}  # (user_id, namespace) -> число инвалидаций
+        self._invalidated_at = {}  # (user_id, namespace) -> время последней инвалидации
+        self._next_prune = time.monotonic() + ttl
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, namespace, key):
+        entry_key = (user_id, namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(entry_key)
+                CACHE_EVICTIONS.labels(reason="ttl").inc()
+                return None
+            self._entries.move_to_end(entry_key)
+            return value
+
+    def generation(self, user_id, namespace):
+        with self._lock:
+            return self._generations.get((user_id, namespace), 0)
+
+    def set(self, user_id, namespace, key, value, generation):
+        if len(value) > self.max_bytes:
+            return
+        entry_key = (user_id, namespace, key)
+        with self._lock:
+            if self._generations.get((user_id, namespace), 0) != generation:
+                # Пока читали БД, прошла запись - данные уже устарели
+                return
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+            self._groups.setdefault((user_id, namespace), set()).add(entry_key)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                CACHE_EVICTIONS.labels(reason="lru").inc()
+            self._update_gauges()
+
+    def invalidate(self, user_id, namespaces):
+        now = time.monotonic()
+        with self._lock:
+            for namespace in namespaces:
+                group = (user_id, namespace)
+                self._generations[group] = self._generations.get(group, 0) + 1
+                self._invalidated_at[group] = now
+                for entry_key in self._groups.pop((user_id, namespace), ()):
+                    if entry_key in self._entries:
+                        self._remove(entry_key, keep_group=True)
+                        CACHE_EVICTIONS.labels(reason="invalidate").inc()
+            if now >= self._next_prune:
+                self._prune_generations(now)
+            self._update_gauges()
+
+    def _prune_generations(self, now: float):
+        """Забывает поколения пустых групп, не сбрасывавшихся дольше TTL.
+
+        Иначе словарь растет с каждым пользователем, который что-то записал.
+        Чтение, запомнившее такое поколение, длилось бы дольше TTL.
+        """
+        for group, invalidated_at in list(self._invalidated_at.items()):
+            if group not in self._groups and invalidated_at <= now - self.ttl:
+                del self._invalidated_at[group]
+                del self._generations[group]
+        self._next_prune = now + self.ttl
+
+    def _remove(self, entry_key, keep_group: bool = False):
+        _, value = self._entries.pop(entry_key)
+        self._bytes -= len(value)
+        if not keep_group:
+            group = self._groups.get(entry_key[:2])
+            if group is not None:
+                group.discard(entry_key)
+                if not group:
+                    del self._groups[entry_key[:2]]
+
+    def _update_gauges(self):
+        CACHE_BYTES.set(self._bytes)
+        CACHE_ENTRIES.set(len(self._entries))
+
+
+class RedisCache(CacheBackend):
+    """Общий для всех воркеров кеш: один hash на пару (пользователь, пространство)"""
+
+    def __init__(self, url: str, ttl: float):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    @staticmethod
+    def _hash_key(user_id, namespace):
+        return f"todo:cache:{user_id}:{namespace}"
+
+    @staticmethod
+    def _generation_key(user_id, namespace):
+        return f"todo:cache-gen:{user_id}:{namespace}"
+
+    def get(self, user_id, namespace, key):
+        raw = self.client.hget(self._hash_key(user_id, namespace), key)
+        if raw is None:
+            return None
+        # Первые 8 байт - срок жизни записи: TTL у redis есть только на весь hash
+        (expires_at,) = struct.unpack("!d", raw[:8])
+        if expires_at <= time.time():
+            return None
+        return raw[8:]
+
+    def generation(self, user_id, namespace):
+        return int(self.client.get(self._generation_key(user_id, namespace)) or 0)
+
+    def set(self, user_id, namespace, key, value, generation):
+        hash_key = self._hash_key(user_id, namespace)
+        generation_key = self._generation_key(user_id, namespace)
+        with self.client.pipeline() as pipe:
+            try:
+                # WATCH: если invalidate другого воркера увеличит поколение
+                # между проверкой и записью, транзакция не выполнится
+                pipe.watch(generation_key)
+                if int(pipe.get(generation_key) or 0) != generation:
+                    return
+                pipe.multi()
+                pipe.hset(hash_key, key, struct.pack("!d", time.time() + self.ttl) + value)
+                pipe.expire(hash_key, int(self.ttl) + 1)
+                pipe.execute()
+            except redis.WatchError:
+                pass
+
+    def invalidate(self, user_id, namespaces):
+        pipe = self.client.pipeline()
+        for namespace in namespaces:
+            # Поколение без TTL: сброс счетчика мог бы совпасть с запомненным чтением
+            pipe.incr(self._generation_key(user_id, namespace))
+            pipe.delete(self._hash_key(user_id, namespace))
+        pipe.execute()
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._hits = 0
+        self._lookups = 0
+        CACHE_HIT_RATIO.set_function(lambda: self._hits / self._lookups if self._lookups else 0.0)
+
+    @staticmethod
+    def request_key(request: Request) -> str:
+        """Путь + отсортированные непустые query-параметры"""
+        params = sorted((k, v) for k, v in request.query_params.multi_items() if v != "")
+        query = "&".join(f"{k}={v.lower() if v.lower() in ('true', 'false') else v}" for k, v in params)
+        return f"{request.url.path}?{query}"
+
+    def get(self, user_id: int, namespace: str, request: Request) -> Optional[Response]:
+        """Ответ из кеша или None; при промахе запоминает в request.state
+        поколение пространства для последующего put - вызывать до чтения БД"""
+        try:
+            value = self.backend.get(user_id, namespace, self.request_key(request))
+            generation = self.backend.generation(user_id, namespace) if value is None else None
+        except Exception as e:
+            # Недоступный кеш не должен ронять чтение
+            logger.warning(f"Response cache read failed: {str(e)}")
+            value = generation = None
+        self._lookups += 1
+        if value is None:
+            CACHE_REQUESTS.labels(namespace=namespace, result="miss").inc()
+            request.state.cache_generation = (user_id, namespace, generation)
+            return None
+        self._hits += 1
+        CACHE_REQUESTS.labels(namespace=namespace, result="hit").inc()
+        return Response(content=value, media_type="application/json", headers={"X-Cache": "hit"})
+
+    def put(self, user_id: int, namespace: str, request: Request, adapter, content) -> Response:
+        """Сериализует content через TypeAdapter, кладет в кеш и возвращает ответ.
+
+        В кеш попадает, только если с промаха в get не было инвалидации.
+        """
+        with tracer.span("serialize", {"cache.namespace": namespace}):
+            body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+        captured = getattr(request.state, "cache_generation", None)
+        if captured is not None and captured[:2] == (user_id, namespace) and captured[2] is not None:
+            try:
+                self.backend.set(user_id, namespace, self.request_key(request), body, captured[2])
+            except Exception as e:
+                logger.warning(f"Response cache write failed: {str(e)}")
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "miss"})
+
+    def invalidate(self, user_id: int, *namespaces: str):
+        try:
+            self.backend.invalidate(user_id, namespaces)
+        except Exception as e:
+            # Устаревшие записи доживут максимум до CACHE_TTL_SECONDS
+            logger.error(f"Response cache invalidation failed: {str(e)}", extra={"user_id": user_id})
+
+
+def create_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache(settings.CACHE_REDIS_URL, settings.CACHE_TTL_SECONDS)
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCache(settings.CACHE_MAX_BYTES, settings.CACHE_TTL_SECONDS)
+    return NullCache()
+
+
+response_cache = ResponseCache(create_backend())
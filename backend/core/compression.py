@@ -0,0 +1,205 @@
+"""Сжатие ответов backend для клиентов, которые ходят мимо nginx.
+
+ASGI-middleware выбирает кодировку по Accept-Encoding (zstd, br, gzip),
+не трогает маленькие ответы и типы вне списка COMPRESSION_CONTENT_TYPES.
+Потоковые ответы сжимаются по частям: в памяти держится не больше
+COMPRESSION_MIN_SIZE байт, пока не ясно, стоит ли сжимать.
+"""
+import time
+import zlib
+
+from core.config import settings
+from metrics import COMPRESSION_INPUT_BYTES, COMPRESSION_OUTPUT_BYTES, COMPRESSION_SECONDS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(settings.COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# В порядке предпочтения при одинаковом q
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+
+def choose_encoding(accept_encoding: str):
+    """Выбирает поддерживаемую кодировку с наибольшим q"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+    wildcard = weights.get("*", 0.0)
+
+    best, best_q = None, 0.0
+    for encoding in ENCODERS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = None, content_types=None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        if content_types is None:
+            content_types = settings.COMPRESSION_CONTENT_TYPES.split(",")
+        self.content_types = {t.strip().lower() for t in content_types if t.strip()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self.minimum_size, self.content_types)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Обертка над send, решающая по первым байтам ответа, сжимать ли его"""
+
+    def __init__(self, send, encoding: str, minimum_size: int, content_types):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.content_types = content_types
+        self.start_message = None
+        self.buffer = bytearray()
+        self.encoder = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            if not self._eligible(message):
+                self.passthrough = True
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is not None:
+            await self._send({
+                "type": "http.response.body",
+                "body": self._compress(body, finish=not more_body),
+                "more_body": more_body,
+            })
+            return
+
+        self.buffer.extend(body)
+        if more_body and len(self.buffer) < self.minimum_size:
+            # Пока не набрали порог, неизвестно, стоит ли сжимать
+            return
+        if not more_body and len(self.buffer) < self.minimum_size:
+            self.passthrough = True
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": bytes(self.buffer), "more_body": False})
+            return
+
+        self.encoder = ENCODERS[self.encoding]()
+        compressed = self._compress(bytes(self.buffer), finish=not more_body)
+        self.buffer = bytearray()
+        headers = [
+            (name, value) for name, value in self.start_message["headers"]
+            if name not in (b"content-length", b"vary")
+        ]
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        headers.append((b"vary", self._vary()))
+        if not more_body:
+            headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+        await self._send({**self.start_message, "headers": headers})
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _eligible(self, message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        content_type = b""
+        for name, value in message.get("headers", []):
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        media_type = content_type.decode("latin-1").split(";")[0].strip().lower()
+        return media_type in self.content_types
+
+    def _vary(self) -> bytes:
+        for name, value in self.start_message.get("headers", []):
+            if name == b"vary":
+                if b"accept-encoding" in value.lower():
+                    return value
+                return value + b", Accept-Encoding"
+        return b"Accept-Encoding"
+
+    def _compress(self, data: bytes, finish: bool) -> bytes:
+        started = time.perf_counter()
+        output = self.encoder.compress(data) if data else b""
+        if finish:
+            output += self.encoder.finish()
+        COMPRESSION_SECONDS.labels(encoding=self.encoding).inc(time.perf_counter() - started)
+        COMPRESSION_INPUT_BYTES.labels(encoding=self.encoding).inc(len(data))
+        COMPRESSION_OUTPUT_BYTES.labels(encoding=self.encoding).inc(len(output))
+        return output
@@ -1,3 +1,5 @@
+from typing import Optional
+
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
@@ -9,6 +11,84 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     BCRYPT_ROUNDS: int = 12
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # Перенос завершенных задач в archived_tasks небольшими пачками
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_BATCH_PAUSE_SECONDS: float = 0.05
+    ARCHIVE_INTERVAL_SECONDS: int = 3600
+
+    # Пул потоков для sync-обработчиков и пул соединений с БД.
+    # Если DB_POOL_SIZE не задан, он равен THREADPOOL_SIZE: каждому
+    # потоку по соединению, иначе потоки стоят в очереди за соединениями
+    THREADPOOL_SIZE: int = 40
+    THREADPOOL_PROBE_SECONDS: float = 1.0
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: int = 10
+
+    # Кеш ответов GET /tasks и /categories: memory (один воркер), redis или none
+    CACHE_BACKEND: str = "memory"
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_TTL_SECONDS: int = 60
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Схема БД: при старте проверяется версия; если отстает - мигрировать
+    # или отказаться стартовать (при нескольких воркерах лучше мигрировать
+    # заранее: python -m core.schema upgrade)
+    DB_MIGRATE_ON_STARTUP: bool = True
+
+    # Дедлайн запроса в секундах (0 - без дедлайна) и переопределения
+    # по префиксу пути через запятую: "/dashboard=5,/tasks/stats=2".
+    # Клиент может сократить дедлайн заголовком X-Request-Timeout
+    REQUEST_TIMEOUT_SECONDS: float = 30.0
+    REQUEST_TIMEOUT_ROUTES: str = ""
+
+    # /dashboard: независимые запросы параллельно на отдельных соединениях
+    # (кроме SQLite, где они все равно выполняются по очереди)
+    DASHBOARD_CONCURRENT_QUERIES: bool = True
+    DASHBOARD_PAGE_SIZE: int = 50
+
+    # Шарды для задач и категорий, URL через запятую; пусто - без шардирования
+    SHARD_DATABASE_URLS: str = ""
+
+    # Сжатие ответов: gzip всегда, brotli/zstd если установлены пакеты
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_CONTENT_TYPES: str = "application/json,text/plain,text/html,text/csv,application/x-ndjson"
+
+    # Отзыв токенов: Bloom-фильтр в памяти перед точной проверкой в БД
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_REBUILD_SECONDS: int = 60
+
+    # Каталог файловых логов (backend.log, error.log)
+    LOG_DIR: str = "/var/log/backend"
+
+    # Трассировка: head-семплирование с долей TRACING_SAMPLE_RATE.
+    # TRACING_TAIL_SAMPLING дополнительно сохраняет все медленные (TRACING_SLOW_MS)
+    # и ошибочные запросы, но ради этого каждый запрос строит спаны на каждый
+    # SQL-запрос и держит их в памяти до конца - поэтому по умолчанию выключено.
+    # Экспорт: file (OTLP/JSON построчно, с ротацией по размеру), otlp (OTLP/HTTP) или none
+    TRACING_ENABLED: bool = True
+    TRACING_SAMPLE_RATE: float = 0.01
+    TRACING_TAIL_SAMPLING: bool = False
+    TRACING_SLOW_MS: int = 500
+    TRACING_EXPORTER: str = "file"
+    TRACING_FILE_PATH: str = "/var/log/backend/traces.jsonl"
+    TRACING_FILE_MAX_BYTES: int = 50 * 1024 * 1024
+    TRACING_FILE_BACKUP_COUNT: int = 3
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318"
+    TRACING_SERVICE_NAME: str = "todo-backend"
+
+    # Мониторинг event loop: LOOP_MONITOR_DEBUG включает поиск блокирующих вызовов
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.5
+    LOOP_BLOCK_THRESHOLD_MS: int = 100
+    LOOP_MONITOR_DEBUG: bool = False
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,234 @@
+"""Дедлайны запросов.
+
+Каждый HTTP-запрос получает дедлайн: REQUEST_TIMEOUT_SECONDS или значение
+для префикса пути из REQUEST_TIMEOUT_ROUTES. Клиент может сократить его
+заголовком X-Request-Timeout (секунды), но не продлить.
+
+Дедлайн хранится в contextvars и доходит до БД (в том числе из потоков
+пула, куда anyio копирует контекст):
+- Postgres: каждый запрос уходит с префиксом SET LOCAL statement_timeout
+  на текущий остаток - в том же round-trip, без отдельного запроса;
+- SQLite: progress handler прерывает выполняющийся запрос, busy_timeout
+  не дает ждать блокировку файла дольше остатка;
+- после дедлайна новые запросы к БД не выполняются вовсе.
+Все это превращается в DeadlineExceeded, которое приложение отдает как 504.
+Если обработчик не уложился, не дойдя до БД, 504 отдает DeadlineMiddleware
+(с небольшим запасом, чтобы на обращении к БД первым сработал дедлайн БД).
+Дедлайн ограничивает подготовку ответа: после отправки заголовков тело
+передается без ограничения, медленный клиент не обрывается.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from core.config import settings
+from metrics import REQUEST_TIMEOUTS
+
+logger = logging.getLogger("todo-app")
+
+TIMEOUT_HEADER = b"x-request-timeout"
+
+# Как часто (в инструкциях VM) SQLite вызывает progress handler
+SQLITE_PROGRESS_STEPS = 1000
+# busy_timeout SQLite по умолчанию в sqlite3 (timeout=5.0)
+SQLITE_DEFAULT_BUSY_MS = 5000
+# Запас для middleware: на дедлайне сначала срабатывает БД и отвечает
+# обработчик ошибки, middleware - страховка для работы без обращений к БД
+HANDLER_GRACE_SECONDS = 0.5
+# SQLSTATE query_canceled (statement_timeout)
+PG_QUERY_CANCELED = "57014"
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Дедлайн запроса истек; роутеры пропускают его дальше, ответ - 504"""
+
+
+def remaining() -> Optional[float]:
+    """Секунд до дедлайна текущего запроса; None вне запроса с дедлайном"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline():
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()
+
+
+def _parse_routes(value: str) -> list:
+    """"/dashboard=5,/tasks/stats=2" -> [(префикс, секунды)], длинные префиксы первыми"""
+    routes = []
+    for item in value.split(","):
+        prefix, _, seconds = item.strip().partition("=")
+        if prefix and seconds:
+            routes.append((prefix.strip(), float(seconds)))
+    return sorted(routes, key=lambda route: len(route[0]), reverse=True)
+
+
+ROUTE_TIMEOUTS = _parse_routes(settings.REQUEST_TIMEOUT_ROUTES)
+
+
+def request_timeout(path: str, header: Optional[str] = None) -> Optional[float]:
+    """Таймаут запроса в секундах; None - без дедлайна"""
+    timeout = settings.REQUEST_TIMEOUT_SECONDS
+    for prefix, seconds in ROUTE_TIMEOUTS:
+        if path.startswith(prefix):
+            timeout = seconds
+            break
+    timeout = timeout if timeout > 0 else None
+    if header:
+        try:
+            requested = float(header)
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            timeout = requested if timeout is None else min(timeout, requested)
+    return timeout
+
+
+def route_label(scope) -> str:
+    """Шаблон маршрута для метрик (без id в пути), если роутинг уже прошел"""
+    route = scope.get("route")
+    return route.path if route is not None else scope["path"]
+
+
+# ========== MIDDLEWARE ==========
+class DeadlineMiddleware:
+    """Выставляет дедлайн запроса и отдает 504, если обработчик не уложился.
+
+    Обработчик в потоке пула прервать нельзя, поэтому ответ уходит, когда
+    поток дойдет до следующего обращения к БД (или выполняющийся запрос
+    будет прерван) - после дедлайна работа в БД не продолжается.
+    Если заголовки ответа уже отправлены, обработчик дорабатывает без срока.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = dict(scope["headers"]).get(TIMEOUT_HEADER)
+        timeout = request_timeout(scope["path"], header.decode("latin-1") if header else None)
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + timeout)
+        try:
+            task = asyncio.ensure_future(self.app(scope, receive, send_wrapper))
+            try:
+                done, _ = await asyncio.wait({task}, timeout=timeout + HANDLER_GRACE_SECONDS)
+                if done or response_started:
+                    # Ответ уже отправляется: тело медленному клиенту не обрываем
+                    await task
+                    return
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if not response_started:
+                REQUEST_TIMEOUTS.labels(endpoint=route_label(scope), source="handler").inc()
+                await deadline_response()(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+
+
+def deadline_response() -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+
+
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded):
+    REQUEST_TIMEOUTS.labels(endpoint=route_label(request.scope), source="db").inc()
+    logger.warning(
+        "Request deadline exceeded",
+        extra={"url": str(request.url), "endpoint": route_label(request.scope)}
+    )
+    return deadline_response()
+
+
+# ========== SQLALCHEMY ==========
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    left = remaining()
+    if left is None:
+        return statement, parameters
+    if left <= 0:
+        raise DeadlineExceeded()
+
+    left_ms = max(1, int(left * 1000))
+    if conn.dialect.name == "postgresql":
+        # Остаток на момент именно этого запроса; префикс уходит вместе с ним,
+        # результат курсора - от последнего запроса строки
+        statement = f"SET LOCAL statement_timeout = {left_ms}; {statement}"
+    elif conn.dialect.name == "sqlite":
+        # Обработчик остается на соединении до возврата в пул: SQLite выполняет
+        # SELECT по мере чтения строк, и прерывать нужно и чтение тоже
+        deadline = _deadline.get()
+        dbapi_connection = conn.connection.dbapi_connection
+        dbapi_connection.set_progress_handler(lambda: time.monotonic() >= deadline, SQLITE_PROGRESS_STEPS)
+        conn.connection.info["deadline_handler"] = True
+        if left_ms < SQLITE_DEFAULT_BUSY_MS:
+            dbapi_connection.execute(f"PRAGMA busy_timeout = {left_ms}")
+            conn.connection.info["deadline_busy"] = True
+    return statement, parameters
+
+
+def _reset_connection(dbapi_connection, connection_record):
+    """Снимает настройки дедлайна, когда соединение возвращается в пул"""
+    if dbapi_connection is None:
+        return
+    if connection_record.info.pop("deadline_handler", False):
+        dbapi_connection.set_progress_handler(None, 0)
+    if connection_record.info.pop("deadline_busy", False):
+        dbapi_connection.execute(f"PRAGMA busy_timeout = {SQLITE_DEFAULT_BUSY_MS}")
+
+
+def _handle_error(exception_context):
+    error = exception_context.original_exception
+    if isinstance(error, DeadlineExceeded):
+        return
+    left = remaining()
+    if left is None:
+        return
+    canceled = getattr(error, "pgcode", None) == PG_QUERY_CANCELED
+    # busy_timeout был урезан до остатка - блокировка не дождалась дедлайна
+    connection = exception_context.connection
+    lock_wait = (
+        "database is locked" in str(error)
+        and connection is not None
+        and connection.connection.info.get("deadline_busy", False)
+    )
+    if left <= 0 or canceled or lock_wait:
+        # Прерванный запрос, statement_timeout или ожидание блокировки до дедлайна
+        raise DeadlineExceeded() from error
+
+
+def install_deadline_hooks():
+    """Проброс дедлайна во все движки (основная БД и шарды)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute, retval=True)
+        event.listen(Engine, "handle_error", _handle_error)
+        event.listen(Pool, "checkin", _reset_connection)
@@ -0,0 +1,98 @@
+"""Мониторинг задержек event loop.
+
+Фоновая задача засыпает на фиксированный интервал и пишет в гистограмму,
+насколько позже запланированного она проснулась - это и есть лаг, который
+видят все запросы в этот момент.
+
+В debug-режиме дополнительно работает сторожевой поток: он ставит в loop
+пустой callback и, если тот не выполнился за LOOP_BLOCK_THRESHOLD_MS,
+снимает стек потока event loop и логирует его. По стеку видно, какая
+корутина или зависимость заблокировала loop.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from core.config import settings
+from metrics import EVENT_LOOP_LAG, EVENT_LOOP_BLOCKS
+
+logger = logging.getLogger("todo-app")
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, threshold: float, debug: bool):
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._stopped.clear()
+        self._task = loop.create_task(self._measure_lag())
+        if self.debug:
+            self._watchdog = threading.Thread(
+                target=self._watch,
+                args=(loop, threading.get_ident()),
+                name="loop-watchdog",
+                daemon=True
+            )
+            self._watchdog.start()
+            logger.info("Event loop watchdog started", extra={"threshold_ms": self.threshold * 1000})
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.threshold * 2)
+            self._watchdog = None
+
+    async def _measure_lag(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - expected))
+
+    def _watch(self, loop, loop_thread_id: int):
+        while not self._stopped.wait(self.interval):
+            responded = threading.Event()
+            try:
+                loop.call_soon_threadsafe(responded.set)
+            except RuntimeError:
+                # loop уже закрыт
+                return
+            if responded.wait(self.threshold):
+                continue
+
+            # Loop не отвечает дольше порога: снимаем стек, пока он еще блокирован
+            started = time.perf_counter() - self.threshold
+            frame = sys._current_frames().get(loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            EVENT_LOOP_BLOCKS.inc()
+
+            while not responded.wait(self.interval):
+                if self._stopped.is_set():
+                    return
+            logger.warning(
+                "Event loop blocked",
+                extra={
+                    "blocked_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "threshold_ms": self.threshold * 1000,
+                    "stack": stack,
+                }
+            )
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=settings.LOOP_BLOCK_THRESHOLD_MS / 1000,
+    debug=settings.LOOP_MONITOR_DEBUG
+)
@@ -0,0 +1,113 @@
+"""Отзыв access-токенов.
+
+Отозванные jti хранятся в таблице revoked_tokens, но на каждом запросе
+проверяется только Bloom-фильтр в памяти: в частом случае (токен не отозван)
+это не стоит ни одного запроса к БД. В БД идем лишь при срабатывании фильтра.
+
+Фильтр свой в каждом процессе и пересобирается из БД при старте и раз в
+REVOCATION_REBUILD_SECONDS, заодно удаляются истекшие записи. Отзыв,
+сделанный другим воркером, становится виден после ближайшей пересборки.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from metrics import TOKEN_REVOCATION_CHECKS, REVOKED_TOKENS
+from models import RevokedToken, SessionLocal
+
+logger = logging.getLogger("todo-app")
+
+
+class BloomFilter:
+    """Bloom-фильтр на bytearray с двойным хешированием"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        # jti, отозванные во время пересборки: их нет в прочитанном снимке
+        self._recent = set()
+
+    def is_revoked(self, jti: str, db: Session) -> bool:
+        if jti not in self._bloom:
+            TOKEN_REVOCATION_CHECKS.labels(result="bloom_negative").inc()
+            return False
+        revoked = db.get(RevokedToken, jti) is not None
+        TOKEN_REVOCATION_CHECKS.labels(result="revoked" if revoked else "bloom_false_positive").inc()
+        return revoked
+
+    def revoke(self, db: Session, jti: str, user_id: int, expires_at: datetime):
+        if db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+            db.commit()
+        with self._lock:
+            self._bloom.add(jti)
+            self._recent.add(jti)
+
+    def refresh(self):
+        """Удаляет истекшие записи и пересобирает фильтр из БД"""
+        with self._lock:
+            self._recent.clear()
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            purged = db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(
+                synchronize_session=False
+            )
+            db.commit()
+            jtis = [row.jti for row in db.query(RevokedToken.jti).yield_per(1000)]
+        finally:
+            db.close()
+
+        # Емкость с запасом, чтобы фильтр не деградировал между пересборками
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            for jti in self._recent:
+                bloom.add(jti)
+            self._bloom = bloom
+        REVOKED_TOKENS.set(len(jtis))
+        if purged:
+            logger.info("Expired revoked tokens purged", extra={"purged": purged, "revoked_tokens": len(jtis)})
+
+
+revocation_store = RevocationStore(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_BLOOM_ERROR_RATE)
+
+
+async def run_revocation_refresh():
+    """Фоновая задача: периодическая пересборка фильтра"""
+    while True:
+        await asyncio.sleep(settings.REVOCATION_REBUILD_SECONDS)
+        try:
+            await asyncio.to_thread(revocation_store.refresh)
+        except Exception as e:
+            logger.error(f"Revocation filter refresh failed: {str(e)}", exc_info=True)
@@ -0,0 +1,139 @@
+"""Версия схемы БД.
+
+Схема ведется миграциями Alembic (backend/migrations). При старте
+приложение только читает alembic_version и сравнивает с SCHEMA_HEAD -
+один короткий запрос без рефлексии таблиц и без импорта alembic
+(сам импорт занимает сотни миллисекунд). SCHEMA_HEAD вычисляется из
+строк revision/down_revision файлов migrations/versions, поэтому новая
+миграция не требует правок здесь. Alembic загружается, только если схема
+действительно отстает.
+
+    python -m core.schema status
+    python -m core.schema upgrade   # основная БД и все шарды
+"""
+import argparse
+import logging
+import os
+import re
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from core.config import settings
+from models import engine, shard_engines
+
+logger = logging.getLogger("todo-app")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VERSIONS_DIR = os.path.join(BACKEND_DIR, "migrations", "versions")
+
+_REVISION_RE = re.compile(r"^(down_revision|revision)\s*=\s*['\"]?([\w-]+)['\"]?", re.MULTILINE)
+
+# Ключ pg_advisory_xact_lock: воркеры не мигрируют одну БД одновременно
+MIGRATION_LOCK_KEY = 7_403_201
+
+
+def script_head() -> str:
+    """Head цепочки миграций: ревизия, на которую не ссылается ни одна другая"""
+    revisions, parents = set(), set()
+    for name in os.listdir(VERSIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, name), encoding="utf-8") as f:
+            found = dict(_REVISION_RE.findall(f.read()))
+        if "revision" in found:
+            revisions.add(found["revision"])
+            if found.get("down_revision") not in (None, "None"):
+                parents.add(found["down_revision"])
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise RuntimeError(f"Expected a single migration head in {VERSIONS_DIR}, found {sorted(heads)}")
+    return heads.pop()
+
+
+# Последняя ревизия в migrations/versions; upgrade() сверяет ее с alembic
+SCHEMA_HEAD = script_head()
+
+
+def all_engines():
+    """Основная БД и шарды без повторов"""
+    return [engine] + [shard_engine for shard_engine in shard_engines if shard_engine is not engine]
+
+
+def current_revision(target=engine) -> Optional[str]:
+    """Ревизия из alembic_version; None для пустой или доалембиковой БД"""
+    with target.connect() as conn:
+        try:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except DBAPIError:
+            # Таблицы нет; в Postgres ошибка прерывает транзакцию, откатываем
+            conn.rollback()
+            return None
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return config
+
+
+def upgrade(target=engine) -> Optional[str]:
+    """Применяет миграции до head, возвращает ревизию до обновления"""
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = _alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+    if head != SCHEMA_HEAD:
+        raise RuntimeError(f"Migration head {head} differs from SCHEMA_HEAD {SCHEMA_HEAD}")
+
+    with target.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        previous = MigrationContext.configure(conn).get_current_revision()
+        if previous != head:
+            config.attributes["connection"] = conn
+            command.upgrade(config, "head")
+    return previous
+
+
+def ensure_schema(target=engine):
+    """Проверка при старте: схема на head, иначе миграция или ошибка"""
+    revision = current_revision(target)
+    if revision == SCHEMA_HEAD:
+        return
+    if not settings.DB_MIGRATE_ON_STARTUP:
+        raise RuntimeError(
+            f"Database schema is at revision {revision}, expected {SCHEMA_HEAD}; "
+            f"run `python -m core.schema upgrade`"
+        )
+    previous = upgrade(target)
+    logger.info(
+        "Database schema upgraded",
+        extra={"database": target.url.render_as_string(hide_password=True),
+               "from_revision": previous, "to_revision": SCHEMA_HEAD}
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.schema", description="Версия схемы БД")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    args = parser.parse_args(argv)
+
+    for target in all_engines():
+        url = target.url.render_as_string(hide_password=True)
+        if args.command == "upgrade":
+            previous = upgrade(target)
+            print(f"{url}: {previous} -> {current_revision(target)}")
+        else:
+            revision = current_revision(target)
+            state = "up to date" if revision == SCHEMA_HEAD else f"behind (head {SCHEMA_HEAD})"
+            print(f"{url}: {revision} {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Долгоживущие сессии на ротируемых refresh-токенах.
+
+Обновление сессии стоит один SHA-256 и пару запросов по индексу вместо
+verify_password с BCRYPT_ROUNDS. Каждый refresh-токен одноразовый:
+повторное предъявление уже использованного токена считается кражей,
+и вся сессия отзывается.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.revocation import revocation_store
+from core.security import create_access_token, create_refresh_token, hash_refresh_token
+from models import RefreshToken, SessionLocal, User
+
+logger = logging.getLogger("todo-app")
+
+# Как часто удалять истекшие refresh-токены
+CLEANUP_INTERVAL_SECONDS = 3600
+
+
+def _client_info(request: Optional[Request]):
+    if request is None:
+        return None, None
+    user_agent = request.headers.get("user-agent", "")[:255] or None
+    ip_address = request.client.host if request.client else None
+    return user_agent, ip_address
+
+
+def issue_tokens(db: Session, user: User, request: Optional[Request] = None,
+                 previous: Optional[RefreshToken] = None) -> dict:
+    """Выдает пару access/refresh; previous - ротируемый токен той же сессии"""
+    now = datetime.utcnow()
+    session_id = previous.session_id if previous else uuid.uuid4().hex
+    jti = uuid.uuid4().hex
+    access_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email, "sid": session_id, "jti": jti},
+        expires_delta=access_expires
+    )
+
+    refresh_token = create_refresh_token()
+    user_agent, ip_address = _client_info(request)
+    db.add(RefreshToken(
+        user_id=user.id,
+        session_id=session_id,
+        token_hash=hash_refresh_token(refresh_token),
+        session_started_at=previous.session_started_at if previous else now,
+        created_at=now,
+        expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        access_jti=jti,
+        access_expires_at=now + access_expires,
+        user_agent=user_agent or (previous.user_agent if previous else None),
+        ip_address=ip_address or (previous.ip_address if previous else None),
+    ))
+    db.commit()
+
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_expires.total_seconds()),
+    }
+
+
+def rotate(db: Session, raw_token: str, request: Optional[Request] = None) -> dict:
+    """Обменивает refresh-токен на новую пару токенов"""
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_refresh_token(raw_token)
+    ).first()
+    now = datetime.utcnow()
+    if token is None or token.revoked_at is not None or token.expires_at <= now:
+        raise invalid
+
+    # Атомарно помечаем токен использованным: из двух параллельных
+    # запросов с одним токеном пройдет только один
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == token.id,
+        RefreshToken.used_at.is_(None)
+    ).update({RefreshToken.used_at: now}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        logger.warning(
+            "Refresh token reuse detected, revoking session",
+            extra={"user_id": token.user_id, "session_id": token.session_id}
+        )
+        revoke_session(db, token.user_id, token.session_id)
+        raise invalid
+
+    user = db.get(User, token.user_id)
+    if user is None or not user.is_active:
+        raise invalid
+    return issue_tokens(db, user, request, previous=token)
+
+
+def list_sessions(db: Session, user_id: int):
+    """Активные сессии: у каждой ровно один неиспользованный токен"""
+    return db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.used_at.is_(None),
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > datetime.utcnow()
+    ).order_by(RefreshToken.created_at.desc()).all()
+
+
+def revoke_session(db: Session, user_id: int, session_id: str) -> bool:
+    """Отзывает все токены сессии и ее текущий access-токен"""
+    now = datetime.utcnow()
+    tokens = db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.session_id == session_id
+    ).all()
+    if not tokens:
+        return False
+    for token in tokens:
+        if token.revoked_at is None:
+            token.revoked_at = now
+    db.commit()
+
+    for token in tokens:
+        if token.access_jti and token.access_expires_at and token.access_expires_at > now:
+            revocation_store.revoke(db, token.access_jti, user_id, token.access_expires_at)
+    return True
+
+
+def purge_expired():
+    db = SessionLocal()
+    try:
+        purged = db.query(RefreshToken).filter(
+            RefreshToken.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return purged
+    finally:
+        db.close()
+
+
+async def run_session_cleanup():
+    """Фоновая задача: удаление истекших refresh-токенов"""
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+        try:
+            purged = await asyncio.to_thread(purge_expired)
+            if purged:
+                logger.info("Expired refresh tokens purged", extra={"purged": purged})
+        except Exception as e:
+            logger.error(f"Refresh token cleanup failed: {str(e)}", exc_info=True)
@@ -0,0 +1,248 @@
+"""Обслуживание шардов: статус, перенос пользователя, ребалансировка.
+
+    python -m core.sharding status
+    python -m core.sharding move --user-id 42 --to 1
+    python -m core.sharding rebalance [--dry-run]
+
+Перенос: пользователь помечается moving (его новые запросы получают 503),
+затем берется исключительная блокировка строки пользователя на исходном
+шарде (lock_user_data). Запись на шард держит ту же блокировку разделяемой
+до commit и после нее перепроверяет справочник, поэтому перенос дожидается
+начатых записей, а опоздавшие получают 503 вместо записи в старый шард.
+Под блокировкой категории, задачи и архив копируются на целевой шард
+с теми же id, справочник переключается, и строки удаляются с исходного.
+
+id сохраняются, чтобы клиентские ссылки (/tasks/{id}) оставались верными.
+Для этого каждый шард на Postgres выдает id из своего диапазона
+(reserve_id_ranges, вызывается при старте). SQLite всегда выдает
+max(id) + 1, и диапазон ему не задать: если id уже заняты на целевом
+шарде, перенос останавливается до удаления исходных строк.
+"""
+import argparse
+import sys
+
+from sqlalchemy import func, insert, text
+from sqlalchemy.exc import IntegrityError
+
+from core.cache import response_cache
+from models import (
+    ArchivedTask, Category, SessionLocal, ShardSessions, Task, User, UserShard,
+    engine, lock_user_data, mirror_user, shard_engines, stable_shard
+)
+
+# Размер диапазона id на шард; INTEGER в Postgres вмещает 21 такой диапазон
+SHARD_ID_SPAN = 100_000_000
+SHARDED_TABLES = ("categories", "tasks", "archived_tasks")
+
+CATEGORY_COLUMNS = ["id", "name", "color", "created_at"]
+TASK_COLUMNS = [
+    "id", "title", "description", "completed", "created_at", "updated_at",
+    "due_date", "priority", "priority_rank",
+]
+ARCHIVED_COLUMNS = TASK_COLUMNS + ["task_id", "archived_at"]
+
+
+def _row(obj, columns):
+    return {name: getattr(obj, name) for name in columns}
+
+
+def _placement(db, user_id: int) -> UserShard:
+    placement = db.get(UserShard, user_id)
+    if placement is None:
+        placement = UserShard(user_id=user_id, shard=stable_shard(user_id), moving=False)
+        db.add(placement)
+        db.commit()
+    return placement
+
+
+def move_user(user_id: int, target: int) -> dict:
+    """Переносит данные пользователя на шард target"""
+    if not 0 <= target < len(shard_engines):
+        raise ValueError(f"Shard {target} does not exist (have {len(shard_engines)})")
+
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user is None:
+            raise ValueError(f"User {user_id} not found")
+        placement = _placement(db, user_id)
+        source = placement.shard
+        if source == target:
+            return {"user_id": user_id, "moved": False, "shard": target}
+
+        placement.moving = True
+        db.commit()
+
+        mirror_user(source, user)
+        # Справочник в той же БД, что и шард: одна транзакция и одна блокировка
+        src = db if shard_engines[source] is engine else ShardSessions[source]()
+        try:
+            lock_user_data(src, user_id, exclusive=True)
+            counts = _copy_rows(src, user, target)
+            placement.shard = target
+            placement.moving = False
+            _delete_rows(src, user_id, source)
+            if src is not db:
+                db.commit()
+            src.commit()
+        except Exception:
+            src.rollback()
+            if src is not db:
+                db.rollback()
+            placement.moving = False
+            db.commit()
+            raise
+        finally:
+            if src is not db:
+                src.close()
+    finally:
+        db.close()
+
+    # Из отдельного процесса инвалидация работает только с общим (redis)
+    # кешем, in-memory кеш сервера доживет до TTL
+    response_cache.invalidate(user_id, "tasks", "categories", "dashboard")
+    return {"user_id": user_id, "moved": True, "from": source, "to": target, **counts}
+
+
+def _copy_rows(src, user, target: int) -> dict:
+    mirror_user(target, user)
+    dst = ShardSessions[target]()
+    try:
+        # Строки копируются с исходными id, category_id остаются верными
+        categories = [
+            {**_row(category, CATEGORY_COLUMNS), "user_id": user.id}
+            for category in src.query(Category).filter(Category.user_id == user.id)
+        ]
+        if categories:
+            dst.execute(insert(Category), categories)
+
+        tasks = [
+            {**_row(task, TASK_COLUMNS), "user_id": user.id, "category_id": task.category_id}
+            for task in src.query(Task).filter(Task.user_id == user.id).yield_per(1000)
+        ]
+        if tasks:
+            dst.execute(insert(Task), tasks)
+
+        archived = [
+            {**_row(task, ARCHIVED_COLUMNS), "user_id": user.id, "category_id": task.category_id}
+            for task in src.query(ArchivedTask).filter(ArchivedTask.user_id == user.id).yield_per(1000)
+        ]
+        if archived:
+            dst.execute(insert(ArchivedTask), archived)
+
+        dst.commit()
+        return {"categories": len(categories), "tasks": len(tasks), "archived_tasks": len(archived)}
+    except IntegrityError as e:
+        dst.rollback()
+        raise ValueError(
+            f"Row ids of user {user.id} are already taken on shard {target}; "
+            f"shards need disjoint id ranges (see reserve_id_ranges)"
+        ) from e
+    except Exception:
+        dst.rollback()
+        raise
+    finally:
+        dst.close()
+
+
+def _delete_rows(db, user_id: int, shard: int):
+    for model in (ArchivedTask, Task, Category):
+        db.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
+    if shard_engines[shard] is not engine:
+        db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+
+
+def reserve_id_ranges():
+    """Сдвигает последовательности id шарда N к N * SHARD_ID_SPAN.
+
+    Идемпотентна: последовательность, уже ушедшая дальше, не трогается.
+    """
+    for index, shard_engine in enumerate(shard_engines):
+        if index == 0 or shard_engine.dialect.name != "postgresql":
+            continue
+        start = index * SHARD_ID_SPAN
+        with shard_engine.begin() as conn:
+            for table in SHARDED_TABLES:
+                sequence = conn.execute(
+                    text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+                ).scalar()
+                if sequence is None:
+                    continue
+                conn.execute(
+                    text("SELECT setval(CAST(:sequence AS regclass), :start, false) "
+                         "WHERE COALESCE((SELECT last_value FROM pg_sequences WHERE "
+                         "CAST(format('%I.%I', schemaname, sequencename) AS regclass) = CAST(:sequence AS regclass)), 0) < :start"),
+                    {"sequence": sequence, "start": start}
+                )
+
+
+def shard_status() -> dict:
+    db = SessionLocal()
+    try:
+        users = dict(db.query(UserShard.shard, func.count()).group_by(UserShard.shard).all())
+        unassigned = db.query(func.count(User.id)).outerjoin(
+            UserShard, UserShard.user_id == User.id
+        ).filter(UserShard.user_id.is_(None)).scalar()
+    finally:
+        db.close()
+
+    shards = []
+    for index, factory in enumerate(ShardSessions):
+        shard_db = factory()
+        try:
+            shards.append({
+                "shard": index,
+                "url": repr(shard_engines[index].url),
+                "users": users.get(index, 0),
+                "tasks": shard_db.query(func.count(Task.id)).scalar(),
+            })
+        finally:
+            shard_db.close()
+    return {"shards": shards, "unassigned_users": unassigned}
+
+
+def rebalance(dry_run: bool = False):
+    """Переносит пользователей, чей текущий шард не совпадает со stable_shard"""
+    db = SessionLocal()
+    try:
+        misplaced = [
+            (p.user_id, p.shard, stable_shard(p.user_id))
+            for p in db.query(UserShard).all()
+            if p.shard != stable_shard(p.user_id)
+        ]
+    finally:
+        db.close()
+    for user_id, source, target in misplaced:
+        if dry_run:
+            print(f"user {user_id}: {source} -> {target}")
+        else:
+            print(move_user(user_id, target))
+    return len(misplaced)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.sharding", description="Обслуживание шардов")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Пользователи и задачи по шардам")
+    move = sub.add_parser("move", help="Перенести пользователя на другой шард")
+    move.add_argument("--user-id", type=int, required=True)
+    move.add_argument("--to", type=int, required=True)
+    balance = sub.add_parser("rebalance", help="Разложить пользователей по stable_shard")
+    balance.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        status = shard_status()
+        for shard in status["shards"]:
+            print(f"shard {shard['shard']}: users={shard['users']} tasks={shard['tasks']} {shard['url']}")
+        print(f"unassigned users: {status['unassigned_users']}")
+    elif args.command == "move":
+        print(move_user(args.user_id, args.to))
+    else:
+        moved = rebalance(dry_run=args.dry_run)
+        print(f"misplaced users: {moved}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
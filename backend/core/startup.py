@@ -0,0 +1,43 @@
+"""Замер холодного старта по фазам.
+
+Фазы пишутся в лог одной записью после старта и в метрику
+app_startup_phase_seconds, чтобы время старта можно было отслеживать.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from metrics import STARTUP_PHASE_SECONDS
+
+logger = logging.getLogger("todo-app")
+
+
+class StartupTimer:
+    def __init__(self):
+        self.phases = {}
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self):
+        for name, seconds in self.phases.items():
+            STARTUP_PHASE_SECONDS.labels(phase=name).set(seconds)
+        logger.info(
+            "Startup timing",
+            extra={
+                "event": "startup_timing",
+                "total_ms": round(sum(self.phases.values()) * 1000, 2),
+                "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()}
+            }
+        )
+
+
+startup_timer = StartupTimer()
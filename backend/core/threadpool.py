@@ -0,0 +1,57 @@
+"""Пул потоков AnyIO, в котором FastAPI выполняет sync-обработчики.
+
+Запрос сначала ждет свободный поток и только потом попадает в обработчик,
+поэтому при нехватке потоков REQUEST_LATENCY эту очередь не видит.
+Размер пула берется из THREADPOOL_SIZE, а загрузка экспортируется в метрики:
+занятые потоки, длина очереди и время ожидания потока, которое меряет
+пробная задача раз в THREADPOOL_PROBE_SECONDS (очередь у лимитера FIFO,
+так что проба ждет столько же, сколько пришедший в тот же момент запрос).
+"""
+import asyncio
+import logging
+import time
+
+import anyio.to_thread
+
+from core.config import settings
+from metrics import THREADPOOL_WAIT, THREADPOOL_CAPACITY, THREADPOOL_BUSY, THREADPOOL_QUEUE
+from models import engine
+
+logger = logging.getLogger("todo-app")
+
+
+def configure_threadpool():
+    """Задает размер лимитера; вызывать внутри запущенного event loop"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.THREADPOOL_SIZE
+
+    THREADPOOL_CAPACITY.set_function(lambda: limiter.total_tokens)
+    THREADPOOL_BUSY.set_function(lambda: limiter.borrowed_tokens)
+    THREADPOOL_QUEUE.set_function(lambda: limiter.statistics().tasks_waiting)
+
+    pool_capacity = _db_pool_capacity()
+    if pool_capacity is not None and pool_capacity < settings.THREADPOOL_SIZE:
+        logger.warning(
+            "DB pool is smaller than the threadpool, threads will queue for connections",
+            extra={"threadpool_size": settings.THREADPOOL_SIZE, "db_pool_capacity": pool_capacity}
+        )
+    return limiter
+
+
+def _db_pool_capacity():
+    pool = engine.pool
+    if not hasattr(pool, "size") or not hasattr(pool, "_max_overflow"):
+        return None
+    if pool._max_overflow < 0:
+        # Неограниченный overflow
+        return None
+    return pool.size() + pool._max_overflow
+
+
+async def run_threadpool_probe():
+    """Фоновая задача: замер ожидания свободного потока"""
+    while True:
+        await asyncio.sleep(settings.THREADPOOL_PROBE_SECONDS)
+        submitted = time.perf_counter()
+        started = await anyio.to_thread.run_sync(time.perf_counter)
+        THREADPOOL_WAIT.observe(max(0.0, started - submitted))
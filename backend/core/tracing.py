@@ -0,0 +1,432 @@
+"""Трассировка запросов.
+
+Легковесная замена OpenTelemetry SDK без зависимостей, совместимая с ним
+на границах: контекст принимается из W3C-заголовка traceparent, спаны
+экспортируются в формате OTLP/JSON - в файл (по строке на пачку) или
+на OTLP/HTTP endpoint (/v1/traces), например в локальный OpenTelemetry
+Collector.
+
+Семплирование:
+- head: решение принимается в начале запроса - по флагу sampled во
+  входящем traceparent, иначе с вероятностью TRACING_SAMPLE_RATE;
+- tail (TRACING_TAIL_SAMPLING, по умолчанию выключено): спаны остальных
+  запросов копятся в памяти до конца запроса, и трасса все равно
+  экспортируется, если запрос был медленнее TRACING_SLOW_MS или завершился
+  ошибкой. Цена - спаны на каждый SQL-запрос у каждого HTTP-запроса,
+  даже если трасса потом отбрасывается.
+
+Текущий спан хранится в contextvars, поэтому доступен и в sync-обработчиках
+(anyio копирует контекст в поток пула), и в логах (TraceContextFilter).
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+from metrics import TRACES
+
+logger = logging.getLogger("todo-app")
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# SpanKind в OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_ERROR = 2
+
+# Длинный SQL в атрибутах обрезается
+MAX_STATEMENT_LENGTH = 2000
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Спаны одного запроса до решения о семплировании"""
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str] = None,
+                 kind: int = KIND_INTERNAL, attributes: dict = None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = None
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_error(self, error):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.add(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status is not None:
+            span["status"] = {"code": self.status, "message": self.status_message or ""}
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+# ========== ЭКСПОРТ ==========
+# Маркер в очереди экспорта: отправить текущую пачку, не дожидаясь таймаута
+_FLUSH = object()
+
+
+class SpanExporter(ABC):
+    """Фоновый поток, отправляющий спаны пачками; запрос не ждет экспорта"""
+
+    def __init__(self, batch_size: int = 512, flush_seconds: float = 2.0, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._flushed = threading.Event()
+
+    def submit(self, spans: list):
+        self._ensure_started()
+        for span in spans:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                # Экспорт не успевает - теряем спаны, а не память
+                TRACES.labels(decision="export_dropped").inc()
+                return
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while batch[-1] is not _FLUSH and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            flush = batch[-1] is _FLUSH
+            spans = [span for span in batch if span is not _FLUSH]
+            if spans:
+                self._flush(spans)
+            if flush:
+                self._flushed.set()
+
+    def _flush(self, spans: list):
+        try:
+            self.export(self.payload(spans))
+        except Exception as e:
+            logger.warning(f"Trace export failed: {str(e)}")
+
+    def flush(self, timeout: float = 5.0):
+        """Дожидается отправки того, что накопилось (при остановке)"""
+        if self._thread is None:
+            return
+        self._flushed.clear()
+        self._queue.put(_FLUSH)
+        self._flushed.wait(timeout)
+
+    @staticmethod
+    def payload(spans: list) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", settings.TRACING_SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "todo-app"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]}
+
+    @abstractmethod
+    def export(self, payload: dict):
+        """Отправляет одну пачку; вызывается из фонового потока"""
+
+
+class FileExporter(SpanExporter):
+    """OTLP/JSON в файл, по строке на пачку (читается filelog-приемником коллектора).
+
+    Ротация по размеру как у RotatingFileHandler: traces.jsonl -> .1 -> ... -> .N
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0, backup_count: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def export(self, payload: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+            size = f.tell()
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class OTLPExporter(SpanExporter):
+    """OTLP/HTTP с JSON-кодированием"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0, **kwargs):
+        super().__init__(**kwargs)
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, payload: dict):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload, separators=(",", ":")).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def create_exporter() -> Optional[SpanExporter]:
+    if settings.TRACING_EXPORTER == "file":
+        return FileExporter(
+            settings.TRACING_FILE_PATH,
+            max_bytes=settings.TRACING_FILE_MAX_BYTES,
+            backup_count=settings.TRACING_FILE_BACKUP_COUNT
+        )
+    if settings.TRACING_EXPORTER == "otlp":
+        return OTLPExporter(settings.TRACING_OTLP_ENDPOINT)
+    return None
+
+
+# ========== ТРАССИРОВЩИК ==========
+class Tracer:
+    def __init__(self, exporter: Optional[SpanExporter], enabled: bool = True,
+                 sample_rate: float = 0.0, slow_ms: float = 500, tail_sampling: bool = False):
+        self.exporter = exporter
+        self.enabled = enabled and exporter is not None
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.tail_sampling = tail_sampling
+
+    @contextmanager
+    def start_trace(self, name: str, traceparent: Optional[str] = None, attributes: dict = None):
+        """Корневой спан запроса; по его завершении решается судьба трассы"""
+        if not self.enabled:
+            yield None
+            return
+
+        match = TRACEPARENT_RE.match(traceparent.strip().lower()) if traceparent else None
+        if match and match.group(1) != "0" * 32:
+            trace_id, parent_id, flags = match.groups()
+            sampled = bool(int(flags, 16) & 1)
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < self.sample_rate
+
+        if not sampled and not self.tail_sampling:
+            # Без tail-семплирования несемплированные запросы не пишут спанов
+            yield None
+            return
+
+        span = Span(Trace(trace_id, sampled), name, parent_id, KIND_SERVER, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self._finish(span)
+
+    def _finish(self, root: Span):
+        trace = root.trace
+        if trace.sampled:
+            decision = "head"
+        elif root.status == STATUS_ERROR:
+            # Ошибка запроса (исключение или 5xx); 4xx и обработанные
+            # ошибки во вложенных спанах трассу не сохраняют
+            decision = "tail_error"
+        elif root.duration_ms >= self.slow_ms:
+            decision = "tail_slow"
+        else:
+            TRACES.labels(decision="dropped").inc()
+            return
+        TRACES.labels(decision=decision).inc()
+        root.set_attribute("sampling.decision", decision)
+        self.exporter.submit(trace.spans)
+
+    def start_span(self, name: str, attributes: dict = None, kind: int = KIND_INTERNAL) -> Optional[Span]:
+        """Дочерний спан текущего; None вне трассы. Закрывается вызовом end()"""
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+    @contextmanager
+    def span(self, name: str, attributes: dict = None, kind: int = KIND_INTERNAL):
+        span = self.start_span(name, attributes, kind)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.flush()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traceparent() -> Optional[str]:
+    """Заголовок для исходящих запросов из текущего спана"""
+    span = _current_span.get()
+    if span is None:
+        return None
+    return f"00-{span.trace.trace_id}-{span.span_id}-{'01' if span.trace.sampled else '00'}"
+
+
+class TracedJSONResponse(JSONResponse):
+    """JSONResponse со спаном на сериализацию тела (response_class приложения)"""
+
+    def render(self, content) -> bytes:
+        with tracer.span("serialize"):
+            return super().render(content)
+
+
+class TraceContextFilter(logging.Filter):
+    """Добавляет trace_id/span_id в записи логов (попадают в JSON)"""
+
+    def filter(self, record):
+        span = _current_span.get()
+        if span is not None:
+            record.trace_id = span.trace.trace_id
+            record.span_id = span.span_id
+        return True
+
+
+# ========== SQLALCHEMY ==========
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = tracer.start_span("db.query", {
+        "db.system": conn.dialect.name,
+        "db.statement": statement[:MAX_STATEMENT_LENGTH],
+    }, KIND_CLIENT)
+    if span is not None:
+        context._trace_span = span
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.rows_affected", cursor.rowcount)
+        span.end()
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.set_error(exception_context.original_exception)
+        span.end()
+
+
+def instrument_sqlalchemy():
+    """Спан на каждый SQL-запрос всех движков (основная БД и шарды)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+tracer = Tracer(
+    create_exporter() if settings.TRACING_ENABLED else None,
+    enabled=settings.TRACING_ENABLED,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+    slow_ms=settings.TRACING_SLOW_MS,
+    tail_sampling=settings.TRACING_TAIL_SAMPLING
+)
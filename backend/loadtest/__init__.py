@@ -0,0 +1,9 @@
+"""Нагрузочное тестирование backend на asyncio.
+
+Гоняет сценарии smoke/load/soak/spike либо по HTTP, либо прямо
+через ASGI-транспорт в том же процессе. Запуск из директории backend:
+
+    python -m loadtest smoke
+    python -m loadtest load --users 50 --duration 120 --base-url http://localhost:8000
+    python -m loadtest spike --seed-users 20 --seed-tasks 5000 --report-dir reports
+"""
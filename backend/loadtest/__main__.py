@@ -0,0 +1,128 @@
+"""CLI нагрузочного теста"""
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+
+import httpx
+
+from loadtest import runner
+from loadtest.report import write_reports
+from loadtest.scenarios import SCENARIOS, build_stages
+
+
+def seed_users(args, run_id: str):
+    """Заранее создает пользователей с большим числом задач через bulk insert"""
+    from core.security import get_password_hash
+    from benchmarks.seed import create_bench_engine, seed, user_email
+    from loadtest.workload import PASSWORD
+    from models import DATABASE_URL
+
+    prefix = f"load-seed-{run_id}"
+    engine = create_bench_engine(args.database_url or DATABASE_URL)
+    try:
+        # Один хеш на всех: bcrypt на каждого пользователя занял бы минуты
+        seed(engine, users=args.seed_users, tasks_per_user=args.seed_tasks,
+             hashed_password=get_password_hash(PASSWORD), email_prefix=prefix, seed=args.seed)
+    finally:
+        engine.dispose()
+    return [user_email(i, prefix) for i in range(args.seed_users)]
+
+
+async def run(args) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    stages = build_stages(args.scenario, users=args.users, duration=args.duration)
+
+    if args.seed_users:
+        emails = runner.seeded_emails(seed_users(args, run_id))
+        register = False
+    else:
+        emails = runner.registered_emails(run_id)
+        register = True
+
+    app = None
+    if args.base_url:
+        transport = httpx.AsyncHTTPTransport(retries=0)
+        base_url = args.base_url
+        target = args.base_url
+    else:
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+        target = "in-process ASGI"
+        # ASGITransport не шлет lifespan, поэтому запускаем startup вручную
+        await app.router.startup()
+
+    limits = httpx.Limits(max_connections=args.max_connections)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url,
+                                     timeout=args.timeout, limits=limits) as client:
+            recorder = await runner.run_scenario(client, stages, emails, register,
+                                                 args.think_time, seed=args.seed)
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+
+    result = {
+        "scenario": args.scenario,
+        "target": target,
+        "stages": [{"duration_seconds": s, "target_users": t} for s, t in stages],
+        "summary": recorder.summary(),
+    }
+    if app is not None:
+        # Сторожевой поток loop_monitor (LOOP_MONITOR_DEBUG) работает в этом же процессе
+        from prometheus_client import REGISTRY
+        result["event_loop_blocks"] = int(REGISTRY.get_sample_value("event_loop_blocks_total") or 0)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Нагрузочный тест backend")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--users", type=int, help="Пиковое число виртуальных пользователей")
+    parser.add_argument("--duration", type=float, help="Общая длительность сценария, секунд")
+    parser.add_argument("--base-url", help="Гонять по HTTP вместо ASGI в процессе")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Средняя пауза между действиями, секунд")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--seed-users", type=int, default=0, help="Создать N пользователей через bulk insert")
+    parser.add_argument("--seed-tasks", type=int, default=1000, help="Задач на засиженного пользователя")
+    parser.add_argument("--database-url", help="БД для сидинга (по умолчанию DATABASE_URL)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report-dir", default="reports")
+    parser.add_argument("--max-p95-ms", type=float, help="Порог p95 для ненулевого кода выхода")
+    parser.add_argument("--max-error-rate", type=float, help="Порог доли ошибок для ненулевого кода выхода")
+    parser.add_argument("--max-loop-blocks", type=int,
+                        help="Порог блокировок event loop (только в процессе, с LOOP_MONITOR_DEBUG=true)")
+    args = parser.parse_args(argv)
+    if args.max_loop_blocks is not None:
+        from core.config import settings
+        if args.base_url or not settings.LOOP_MONITOR_DEBUG:
+            parser.error("--max-loop-blocks requires in-process run with LOOP_MONITOR_DEBUG=true")
+
+    result = asyncio.run(run(args))
+    paths = write_reports(result, args.report_dir)
+    total = result["summary"]["total"]
+    print(json.dumps(total, indent=2))
+    print(f"Отчеты: {paths['json']}, {paths['html']}")
+
+    failed = False
+    if args.max_p95_ms is not None and total["p95_ms"] > args.max_p95_ms:
+        print(f"p95 {total['p95_ms']} мс превышает порог {args.max_p95_ms} мс", file=sys.stderr)
+        failed = True
+    if args.max_error_rate is not None and total["error_rate"] > args.max_error_rate:
+        print(f"Доля ошибок {total['error_rate']} превышает порог {args.max_error_rate}", file=sys.stderr)
+        failed = True
+    blocks = result.get("event_loop_blocks")
+    if blocks is not None:
+        print(f"Блокировок event loop: {blocks}")
+    if args.max_loop_blocks is not None and blocks > args.max_loop_blocks:
+        print(f"Блокировок event loop {blocks} больше порога {args.max_loop_blocks}, "
+              f"стеки - в логе 'Event loop blocked'", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Отчеты о прогоне в JSON и HTML"""
+import html
+import json
+import os
+from datetime import datetime
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>Load test: {scenario}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; color: #333; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ddd; padding: 6px 10px; text-align: right; }}
+th {{ background: #667eea; color: #fff; }}
+td:first-child {{ text-align: left; font-family: monospace; }}
+tr.total td {{ font-weight: bold; background: #f5f5f5; }}
+.bad {{ color: #c0392b; }}
+</style>
+</head>
+<body>
+<h1>Load test: {scenario}</h1>
+<p>Цель: {target} &middot; Длительность: {duration} c &middot; Пик пользователей: {max_users} &middot; Обновлений токена: {reauths} &middot; {created_at}</p>
+<table>
+<tr><th>Endpoint</th><th>Запросов</th><th>RPS</th><th>Ошибки</th><th>p50, мс</th><th>p95, мс</th><th>p99, мс</th><th>max, мс</th></tr>
+{rows}
+</table>
+</body>
+</html>
+"""
+
+COLUMNS = ["requests", "throughput_rps", "error_rate", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+
+def _row(name: str, stats: dict, css_class: str = "") -> str:
+    cells = []
+    for column in COLUMNS:
+        value = stats[column]
+        if column == "error_rate":
+            bad = " class=\"bad\"" if value > 0 else ""
+            cells.append(f"<td{bad}>{stats['errors']} ({value:.2%})</td>")
+        else:
+            cells.append(f"<td>{value}</td>")
+    return f"<tr class=\"{css_class}\"><td>{html.escape(name)}</td>{''.join(cells)}</tr>"
+
+
+def write_reports(result: dict, report_dir: str) -> dict:
+    """Сохраняет result в report_dir, возвращает пути к файлам"""
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(report_dir, f"{result['scenario']}-{stamp}")
+
+    json_path = base + ".json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    summary = result["summary"]
+    rows = [_row(name, stats) for name, stats in summary["endpoints"].items()]
+    rows.append(_row("TOTAL", summary["total"], "total"))
+    html_path = base + ".html"
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(HTML_TEMPLATE.format(
+            scenario=html.escape(result["scenario"]),
+            target=html.escape(result["target"]),
+            duration=summary["duration_seconds"],
+            max_users=summary["max_users"],
+            reauths=sum(summary.get("reauths", {}).values()),
+            created_at=datetime.utcnow().isoformat(timespec="seconds"),
+            rows="\n".join(rows),
+        ))
+    return {"json": json_path, "html": html_path}
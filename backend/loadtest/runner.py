@@ -0,0 +1,54 @@
+"""Управление виртуальными пользователями по этапам сценария"""
+import asyncio
+import itertools
+import random
+import time
+
+from loadtest.scenarios import target_at, total_duration
+from loadtest.stats import Recorder
+from loadtest.workload import VirtualUser
+
+# Как часто пересчитывается целевое число пользователей
+TICK_SECONDS = 0.5
+
+
+async def run_scenario(client, stages, emails, register: bool, think_time: float, seed: int = None) -> Recorder:
+    """Гоняет нагрузку по этапам stages и возвращает собранную статистику.
+
+    emails - бесконечный итератор адресов для новых пользователей.
+    """
+    recorder = Recorder()
+    rng = random.Random(seed)
+    users = []
+    started = time.monotonic()
+    duration = total_duration(stages)
+
+    try:
+        while True:
+            elapsed = time.monotonic() - started
+            if elapsed >= duration:
+                break
+            target = target_at(stages, elapsed)
+            users = [task for task in users if not task.done()]
+            while len(users) < target:
+                user = VirtualUser(client, recorder, next(emails), register, think_time,
+                                   random.Random(rng.random()))
+                users.append(asyncio.create_task(user.run()))
+            while len(users) > target:
+                users.pop().cancel()
+            recorder.max_users = max(recorder.max_users, len(users))
+            await asyncio.sleep(TICK_SECONDS)
+    finally:
+        for task in users:
+            task.cancel()
+        await asyncio.gather(*users, return_exceptions=True)
+        recorder.finish()
+    return recorder
+
+
+def registered_emails(run_id: str):
+    return (f"load-{run_id}-{n}@example.com" for n in itertools.count())
+
+
+def seeded_emails(emails):
+    return itertools.cycle(emails)
@@ -0,0 +1,43 @@
+"""Профили нагрузки (повторяют stress-tests/tests/load-tests/configs/test-scenarios.js)"""
+
+# Этап: (длительность в секундах, целевое число виртуальных пользователей)
+SCENARIOS = {
+    "smoke": [(10, 1)],
+    "load": [(120, 100), (300, 100), (120, 0)],
+    "soak": [(300, 50), (7200, 50), (300, 0)],
+    "spike": [(60, 50), (10, 500), (60, 500), (10, 0)],
+}
+
+
+def build_stages(name: str, users: int = None, duration: float = None):
+    """Возвращает этапы сценария, масштабированные под users и duration.
+
+    users задает пиковое число пользователей, duration - общую длительность;
+    пропорции этапов сохраняются.
+    """
+    stages = SCENARIOS[name]
+    peak = max(target for _, target in stages)
+    total = sum(seconds for seconds, _ in stages)
+    user_scale = users / peak if users else 1
+    time_scale = duration / total if duration else 1
+    return [
+        (seconds * time_scale, max(0, round(target * user_scale)))
+        for seconds, target in stages
+    ]
+
+
+def target_at(stages, elapsed: float, start_users: int = 0) -> int:
+    """Число пользователей в момент elapsed с линейным разгоном внутри этапа"""
+    previous = start_users
+    for seconds, target in stages:
+        if elapsed < seconds:
+            if seconds <= 0:
+                return target
+            return round(previous + (target - previous) * elapsed / seconds)
+        elapsed -= seconds
+        previous = target
+    return previous
+
+
+def total_duration(stages) -> float:
+    return sum(seconds for seconds, _ in stages)
@@ -0,0 +1,69 @@
+"""Сбор латентности и ошибок по endpoint'ам"""
+import time
+from collections import defaultdict
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Recorder:
+    """Хранит латентности всех запросов, сгруппированные по endpoint'у"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.reauths = defaultdict(int)
+        self.max_users = 0
+
+    def record(self, endpoint: str, seconds: float, status_code: int = None, error: str = None):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][str(status_code) if status_code else error or "error"] += 1
+        if error or status_code is None or status_code >= 400:
+            self.errors[endpoint] += 1
+
+    def record_reauth(self, method: str):
+        """Обновление истекшего токена (refresh или повторный логин) - не ошибка"""
+        self.reauths[method] += 1
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    def summary(self) -> dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        endpoints = {}
+        all_latencies = []
+        for endpoint, values in sorted(self.latencies.items()):
+            all_latencies.extend(values)
+            endpoints[endpoint] = self._describe(values, self.errors[endpoint], elapsed)
+            endpoints[endpoint]["statuses"] = dict(self.statuses[endpoint])
+        total = self._describe(all_latencies, sum(self.errors.values()), elapsed)
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": round(elapsed, 3),
+            "max_users": self.max_users,
+            "reauths": dict(self.reauths),
+            "total": total,
+            "endpoints": endpoints,
+        }
+
+    @staticmethod
+    def _describe(values, errors: int, elapsed: float) -> dict:
+        count = len(values)
+        return {
+            "requests": count,
+            "errors": errors,
+            "error_rate": round(errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+        }
@@ -0,0 +1,130 @@
+"""Поведение виртуального пользователя: регистрация, логин, CRUD задач"""
+import asyncio
+import random
+import time
+
+import httpx
+
+PASSWORD = "LoadTest123"
+
+# Смешанная нагрузка: (действие, вес)
+ACTIONS = [
+    ("list_tasks", 35),
+    ("stats", 15),
+    ("list_categories", 10),
+    ("create_task", 15),
+    ("update_task", 10),
+    ("complete_task", 10),
+    ("delete_task", 5),
+]
+
+
+class VirtualUser:
+    """Один пользователь со своим токеном и списком созданных задач"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder, email: str, register: bool,
+                 think_time: float, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.email = email
+        self.register = register
+        self.think_time = think_time
+        self.rng = rng
+        self.headers = {}
+        self.refresh_token = None
+        self.task_ids = []
+
+    async def request(self, name: str, method: str, url: str, retry_auth: bool = True, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(name, time.perf_counter() - start, error=type(e).__name__)
+            return None
+        if response.status_code == 401 and retry_auth and self.headers and await self.reauthenticate():
+            # Истекший access token - не ошибка бэкенда: обновляем токен и повторяем
+            return await self.request(name, method, url, retry_auth=False, **kwargs)
+        self.recorder.record(name, time.perf_counter() - start, response.status_code)
+        return response
+
+    async def login(self) -> bool:
+        credentials = {"email": self.email, "password": PASSWORD}
+        if self.register:
+            await self.request("POST /auth/register", "POST", "/auth/register", json=credentials)
+            self.register = False
+        response = await self.request("POST /auth/login", "POST", "/auth/login",
+                                      retry_auth=False, json=credentials)
+        return self._store_tokens(response)
+
+    async def reauthenticate(self) -> bool:
+        """Новый access token: через refresh token, если он есть, иначе повторный логин"""
+        if self.refresh_token:
+            response = await self.request("POST /auth/refresh", "POST", "/auth/refresh", retry_auth=False,
+                                          json={"refresh_token": self.refresh_token})
+            if self._store_tokens(response):
+                self.recorder.record_reauth("refresh")
+                return True
+        if await self.login():
+            self.recorder.record_reauth("login")
+            return True
+        return False
+
+    def _store_tokens(self, response) -> bool:
+        if response is None or response.status_code != 200:
+            return False
+        tokens = response.json()
+        self.headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        self.refresh_token = tokens.get("refresh_token")
+        return True
+
+    async def run(self):
+        if not await self.login():
+            return
+        names, weights = zip(*ACTIONS)
+        while True:
+            action = self.rng.choices(names, weights)[0]
+            await getattr(self, action)()
+            if self.think_time:
+                await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.think_time)
+
+    # ========== ДЕЙСТВИЯ ==========
+    async def list_tasks(self):
+        params = self.rng.choice([{}, {"completed": "false"}, {"completed": "true"}])
+        response = await self.request("GET /tasks/", "GET", "/tasks/", params=params)
+        if response is not None and response.status_code == 200 and not self.task_ids:
+            # Подхватываем задачи засиженного пользователя
+            self.task_ids = [task["id"] for task in response.json()[:50]]
+
+    async def stats(self):
+        await self.request("GET /tasks/stats", "GET", "/tasks/stats")
+
+    async def list_categories(self):
+        await self.request("GET /categories/", "GET", "/categories/")
+
+    async def create_task(self):
+        response = await self.request("POST /tasks/", "POST", "/tasks/", json={
+            "title": f"load task {self.rng.randrange(1_000_000)}",
+            "description": "created by loadtest",
+        })
+        if response is not None and response.status_code == 200:
+            self.task_ids.append(response.json()["id"])
+
+    async def update_task(self):
+        if not self.task_ids:
+            return await self.create_task()
+        task_id = self.rng.choice(self.task_ids)
+        await self.request("PUT /tasks/{id}", "PUT", f"/tasks/{task_id}", json={
+            "title": f"updated {self.rng.randrange(1_000_000)}",
+        })
+
+    async def complete_task(self):
+        if not self.task_ids:
+            return await self.create_task()
+        task_id = self.rng.choice(self.task_ids)
+        await self.request("PATCH /tasks/{id}/complete", "PATCH", f"/tasks/{task_id}/complete")
+
+    async def delete_task(self):
+        if not self.task_ids:
+            return await self.create_task()
+        task_id = self.task_ids.pop(self.rng.randrange(len(self.task_ids)))
+        await self.request("DELETE /tasks/{id}", "DELETE", f"/tasks/{task_id}")
@@ -1,6 +1,9 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
 import logging
 import sys
-import time
 import os
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
@@ -8,62 +11,82 @@ from logging.handlers import RotatingFileHandler
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
-from prometheus_client import Counter, Histogram, generate_latest, REGISTRY, CONTENT_TYPE_LATEST
-from pythonjsonlogger import jsonlogger
+from prometheus_client import generate_latest, REGISTRY, CONTENT_TYPE_LATEST
 
 from core.config import settings
-from models import Base, engine
-from routers import auth, tasks, categories, users
+from core.schema import all_engines, ensure_schema
+from core.startup import startup_timer
+from core.deadlines import DeadlineExceeded, DeadlineMiddleware, deadline_exceeded_handler, install_deadline_hooks
+from core.tracing import TraceContextFilter, TracedJSONResponse, instrument_sqlalchemy, tracer
+from core.revocation import revocation_store, run_revocation_refresh
+from core.sessions import run_session_cleanup
+from core.archival import run_archival
+from core.sharding import reserve_id_ranges
+from core.loop_monitor import loop_monitor
+from core.threadpool import configure_threadpool, run_threadpool_probe
+from core.compression import CompressionMiddleware
+from models import SHARDING_ENABLED
+from routers import auth, tasks, categories, users, dashboard
 from metrics import REQUEST_COUNT, REQUEST_LATENCY, TASK_CREATED, TASK_COMPLETED
 
 # ========== НАСТРОЙКА ЛОГИРОВАНИЯ ==========
-# Создаем директорию для логов если её нет
-log_dir = "/var/log/backend"
-os.makedirs(log_dir, exist_ok=True)
+log_dir = settings.LOG_DIR
 
 # Настройка корневого логгера
 logger = logging.getLogger("todo-app")
 logger.setLevel(logging.INFO)
 
-# Форматтер для JSON логов
-json_formatter = jsonlogger.JsonFormatter(
-    '%(asctime)s %(name)s %(levelname)s %(message)s %(module)s %(funcName)s %(lineno)d',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+def setup_logging():
+    """Обработчики логов; вызывается при старте, а не при импорте модуля"""
+    if logger.handlers:
+        return
+    from pythonjsonlogger import jsonlogger
 
-# 1. Console handler (stdout)
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(json_formatter)
-console_handler.setLevel(logging.INFO)
-
-# 2. File handler для Loki (с ротацией)
-file_handler = RotatingFileHandler(
-    filename=os.path.join(log_dir, "backend.log"),
-    maxBytes=10 * 1024 * 1024,  # 10MB
-    backupCount=5,
-    encoding='utf-8'
-)
-file_handler.setFormatter(json_formatter)
-file_handler.setLevel(logging.INFO)
-
-# 3. Error file handler (отдельный файл для ошибок)
-error_file_handler = RotatingFileHandler(
-    filename=os.path.join(log_dir, "error.log"),
-    maxBytes=5 * 1024 * 1024,  # 5MB
-    backupCount=3,
-    encoding='utf-8'
-)
-error_file_handler.setFormatter(json_formatter)
-error_file_handler.setLevel(logging.ERROR)
+    # Создаем директорию для логов если её нет
+    os.makedirs(log_dir, exist_ok=True)
+
+    # Форматтер для JSON логов
+    json_formatter = jsonlogger.JsonFormatter(
+        '%(asctime)s %(name)s %(levelname)s %(message)s %(module)s %(funcName)s %(lineno)d',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
 
-# Добавляем все обработчики к логгеру
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
-logger.addHandler(error_file_handler)
+    # 1. Console handler (stdout)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(json_formatter)
+    console_handler.setLevel(logging.INFO)
 
-# Отключаем логирование от uvicorn по умолчанию
-logging.getLogger("uvicorn").handlers = []
-logging.getLogger("uvicorn.access").handlers = []
+    # 2. File handler для Loki (с ротацией)
+    file_handler = RotatingFileHandler(
+        filename=os.path.join(log_dir, "backend.log"),
+        maxBytes=10 * 1024 * 1024,  # 10MB
+        backupCount=5,
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(json_formatter)
+    file_handler.setLevel(logging.INFO)
+
+    # 3. Error file handler (отдельный файл для ошибок)
+    error_file_handler = RotatingFileHandler(
+        filename=os.path.join(log_dir, "error.log"),
+        maxBytes=5 * 1024 * 1024,  # 5MB
+        backupCount=3,
+        encoding='utf-8'
+    )
+    error_file_handler.setFormatter(json_formatter)
+    error_file_handler.setLevel(logging.ERROR)
+
+    # trace_id/span_id текущего запроса в каждой записи
+    logger.addFilter(TraceContextFilter())
+
+    # Добавляем все обработчики к логгеру
+    logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+    logger.addHandler(error_file_handler)
+
+    # Отключаем логирование от uvicorn по умолчанию
+    logging.getLogger("uvicorn").handlers = []
+    logging.getLogger("uvicorn.access").handlers = []
 
 # ========== СОЗДАНИЕ ПРИЛОЖЕНИЯ ==========
 app = FastAPI(
@@ -71,10 +94,14 @@ app = FastAPI(
     version="1.0.0",
     description="Backend для управления задачами с мониторингом",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=TracedJSONResponse
 )
 
 # ========== MIDDLEWARE ==========
+# Дедлайн запроса (внутренний слой: 504 проходит через логирование и метрики)
+app.add_middleware(DeadlineMiddleware)
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Middleware для логирования запросов и сбора метрик"""
@@ -87,63 +114,83 @@ async def log_requests(request: Request, call_next):
     
     request_id = f"{int(time.time() * 1000)}_{hash(request.client.host if request.client else 'unknown') % 10000}"
     
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        status_code = response.status_code
+    trace = tracer.start_trace(
+        f"{request.method} {request.url.path}",
+        request.headers.get("traceparent"),
+        {
+            "http.method": request.method,
+            "http.target": request.url.path,
+            "client.address": request.client.host if request.client else "unknown",
+            "request_id": request_id,
+        }
+    )
+    with trace as span:
+        try:
+            response = await call_next(request)
+            process_time = time.time() - start_time
+            status_code = response.status_code
         
-        # Логируем успешный запрос
-        logger.info(
-            "Request completed",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "url": str(request.url),
-                "status_code": status_code,
-                "process_time_ms": round(process_time * 1000, 2),
-                "client_ip": request.client.host if request.client else "unknown",
-                "user_agent": request.headers.get("user-agent", ""),
-                "response_size": len(response.body) if hasattr(response, 'body') else 0
-            }
-        )
+            # Логируем успешный запрос
+            logger.info(
+                "Request completed",
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "url": str(request.url),
+                    "status_code": status_code,
+                    "process_time_ms": round(process_time * 1000, 2),
+                    "client_ip": request.client.host if request.client else "unknown",
+                    "user_agent": request.headers.get("user-agent", ""),
+                    "response_size": len(response.body) if hasattr(response, 'body') else 0
+                }
+            )
         
-        # Обновляем метрики
-        REQUEST_COUNT.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status_code=status_code
-        ).inc()
+            # Обновляем метрики
+            REQUEST_COUNT.labels(
+                method=request.method,
+                endpoint=request.url.path,
+                status_code=status_code
+            ).inc()
         
-        REQUEST_LATENCY.labels(
-            method=request.method,
-            endpoint=request.url.path
-        ).observe(process_time)
+            REQUEST_LATENCY.labels(
+                method=request.method,
+                endpoint=request.url.path
+            ).observe(process_time)
         
-        # Добавляем заголовок с временем обработки
-        response.headers["X-Process-Time"] = str(process_time)
-        response.headers["X-Request-ID"] = request_id
+            # Добавляем заголовок с временем обработки
+            response.headers["X-Process-Time"] = str(process_time)
+            response.headers["X-Request-ID"] = request_id
+            if span is not None:
+                response.headers["X-Trace-ID"] = span.trace.trace_id
+                route = request.scope.get("route")
+                if route is not None:
+                    span.name = f"{request.method} {route.path}"
+                    span.set_attribute("http.route", route.path)
+                span.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    span.set_error(f"HTTP {status_code}")
         
-        return response
+            return response
         
-    except Exception as e:
-        process_time = time.time() - start_time
+        except Exception as e:
+            process_time = time.time() - start_time
         
-        # Логируем ошибку
-        logger.error(
-            f"Request failed: {str(e)}",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "url": str(request.url),
-                "process_time_ms": round(process_time * 1000, 2),
-                "client_ip": request.client.host if request.client else "unknown",
-                "error_type": type(e).__name__,
-                "error_message": str(e)
-            },
-            exc_info=True
-        )
+            # Логируем ошибку
+            logger.error(
+                f"Request failed: {str(e)}",
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "url": str(request.url),
+                    "process_time_ms": round(process_time * 1000, 2),
+                    "client_ip": request.client.host if request.client else "unknown",
+                    "error_type": type(e).__name__,
+                    "error_message": str(e)
+                },
+                exc_info=True
+            )
         
-        raise e
+            raise e
 
 # CORS Middleware
 app.add_middleware(
@@ -159,9 +206,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Process-Time", "X-Request-ID"]
+    expose_headers=["X-Process-Time", "X-Request-ID", "X-Trace-ID"]
 )
 
+# Сжатие ответов (внешний слой, чтобы сжимать уже готовый ответ)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # ========== ЭНДПОИНТЫ ==========
 @app.get("/")
 async def root():
@@ -204,16 +255,43 @@ app.include_router(auth.router, prefix="/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
 app.include_router(categories.router, prefix="/categories", tags=["categories"])
+app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
 
 # ========== СОБЫТИЯ ПРИЛОЖЕНИЯ ==========
 app_start_time = time.time()
+background_tasks = []
+startup_timer.record("import", time.perf_counter() - _import_started)
 
 @app.on_event("startup")
 async def startup_event():
     """Действия при запуске приложения"""
+    with startup_timer.phase("logging"):
+        setup_logging()
+        instrument_sqlalchemy()
+        install_deadline_hooks()
     try:
-        # Создаем таблицы в БД
-        Base.metadata.create_all(bind=engine)
+        # Сверяем версию схемы (основная БД и шарды), миграции - только если отстает
+        with startup_timer.phase("schema"):
+            for target in all_engines():
+                ensure_schema(target)
+            if SHARDING_ENABLED:
+                reserve_id_ranges()
+
+        # Загружаем отозванные токены и запускаем периодическую пересборку фильтра
+        with startup_timer.phase("revocation"):
+            revocation_store.refresh()
+
+        with startup_timer.phase("background"):
+            background_tasks.append(asyncio.create_task(run_revocation_refresh()))
+            background_tasks.append(asyncio.create_task(run_session_cleanup()))
+            if settings.ARCHIVE_ENABLED:
+                background_tasks.append(asyncio.create_task(run_archival()))
+            loop_monitor.start()
+
+            # Пул потоков для sync-обработчиков и замер очереди к нему
+            configure_threadpool()
+            background_tasks.append(asyncio.create_task(run_threadpool_probe()))
+        startup_timer.report()
         
         logger.info(
             "Application started successfully",
@@ -245,6 +323,13 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Действия при остановке приложения"""
+    await loop_monitor.stop()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    tracer.shutdown()
+
     logger.info(
         "Application shutting down",
         extra={
@@ -275,6 +360,9 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         headers=exc.headers
     )
 
+# Дедлайн истек на обращении к БД: 504 вместо 500
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Обработчик всех остальных исключений"""
@@ -306,5 +394,6 @@ if __name__ == "__main__":
         "workers": 1  # Для начала достаточно 1 воркера
     }
     
+    setup_logging()
     logger.info("Starting uvicorn server", extra=uvicorn_config)
     uvicorn.run(**uvicorn_config)
\ No newline at end of file
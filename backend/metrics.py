@@ -3,7 +3,6 @@ from prometheus_client.core import CollectorRegistry
 import time
 from fastapi import Request, Response
 import asyncio
-import psutil
 import os
 
 # Метрики HTTP запросов
@@ -26,6 +25,7 @@ TASKS_BY_STATUS = Gauge('tasks_by_status', 'Tasks count by status', ['status'])
 TASK_CREATED = Counter('tasks_created_total', 'Total tasks created')
 TASK_COMPLETED = Counter('tasks_completed_total', 'Total tasks completed')
 ACTIVE_USERS = Gauge('active_users_current', 'Current active users')
+TASKS_ARCHIVED = Counter('tasks_archived_total', 'Completed tasks moved to archived_tasks')
 
 # Системные метрики
 DATABASE_ERRORS = Counter('database_errors_total', 'Total database errors')
@@ -49,6 +49,89 @@ REQUESTS_IN_PROGRESS = Gauge(
     ['method', 'endpoint']
 )
 
+# Дедлайны запросов: source=db - прерван/не начат запрос к БД,
+# handler - обработчик не уложился без обращения к БД
+REQUEST_TIMEOUTS = Counter(
+    'request_timeouts_total',
+    'Requests that exceeded their deadline',
+    ['endpoint', 'source']
+)
+
+# Трассировка: решения семплирования по трассам
+TRACES = Counter(
+    'traces_total',
+    'Finished request traces by sampling decision',
+    ['decision']  # head, tail_error, tail_slow, dropped, export_dropped
+)
+
+# Холодный старт
+STARTUP_PHASE_SECONDS = Gauge(
+    'app_startup_phase_seconds',
+    'Duration of each application startup phase',
+    ['phase']  # import, logging, schema, revocation, background
+)
+
+# Отзыв токенов
+TOKEN_REVOCATION_CHECKS = Counter(
+    'token_revocation_checks_total',
+    'Token revocation checks by outcome',
+    ['result']  # bloom_negative, bloom_false_positive, revoked
+)
+REVOKED_TOKENS = Gauge('revoked_tokens_current', 'Unexpired revoked tokens loaded into the Bloom filter')
+
+# Event loop
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'Delay between scheduled and actual wake-up of the event loop monitor',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+EVENT_LOOP_BLOCKS = Counter(
+    'event_loop_blocks_total',
+    'Times the event loop was blocked longer than the threshold (debug mode)'
+)
+
+# Пул потоков AnyIO для sync-обработчиков
+THREADPOOL_WAIT = Histogram(
+    'threadpool_wait_seconds',
+    'Time a probe job waited for a worker thread',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+THREADPOOL_CAPACITY = Gauge('threadpool_capacity_threads', 'Worker thread limiter capacity')
+THREADPOOL_BUSY = Gauge('threadpool_busy_threads', 'Worker threads currently borrowed')
+THREADPOOL_QUEUE = Gauge('threadpool_queue_length', 'Tasks waiting for a worker thread')
+
+# Сжатие ответов
+COMPRESSION_INPUT_BYTES = Counter(
+    'http_compression_input_bytes_total',
+    'Response bytes before compression',
+    ['encoding']
+)
+COMPRESSION_OUTPUT_BYTES = Counter(
+    'http_compression_output_bytes_total',
+    'Response bytes after compression',
+    ['encoding']
+)
+COMPRESSION_SECONDS = Counter(
+    'http_compression_seconds_total',
+    'Time spent compressing responses',
+    ['encoding']
+)
+
+# Кеш ответов
+CACHE_REQUESTS = Counter(
+    'response_cache_requests_total',
+    'Response cache lookups',
+    ['namespace', 'result']  # hit, miss
+)
+CACHE_HIT_RATIO = Gauge('response_cache_hit_ratio', 'Response cache hit ratio since start')
+CACHE_BYTES = Gauge('response_cache_bytes', 'Bytes held by the in-process response cache')
+CACHE_ENTRIES = Gauge('response_cache_entries', 'Entries held by the in-process response cache')
+CACHE_EVICTIONS = Counter(
+    'response_cache_evictions_total',
+    'Response cache evictions',
+    ['reason']  # lru, ttl, invalidate
+)
+
 # Метрики процесса
 PROCESS_MEMORY_USAGE = Gauge('process_memory_usage_bytes', 'Memory usage of the process')
 PROCESS_CPU_USAGE = Gauge('process_cpu_usage_percent', 'CPU usage of the process')
@@ -134,6 +217,8 @@ class MetricsMiddleware:
 def update_process_metrics():
     """Обновление метрик процесса"""
     try:
+        import psutil  # нужен только здесь, не грузим при старте
+
         process = psutil.Process(os.getpid())
         memory_info = process.memory_info()
         PROCESS_MEMORY_USAGE.set(memory_info.rss)  # RSS - Resident Set Size
@@ -0,0 +1,57 @@
+"""Окружение Alembic.
+
+Соединение берется из config.attributes["connection"], если миграции
+запускает приложение (core.schema). Из командной строки - основная БД
+или шард, заданный через -x shard=N.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from models import Base, DATABASE_URL, SHARD_URLS, engine, shard_engines
+
+config = context.config
+connection = config.attributes.get("connection")
+
+# Логирование из alembic.ini нужно только CLI; в приложении оно свое
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def _shard():
+    shard = context.get_x_argument(as_dictionary=True).get("shard")
+    return int(shard) if shard is not None else None
+
+
+def run_migrations_offline():
+    shard = _shard()
+    url = SHARD_URLS[shard] if shard is not None and SHARD_URLS else DATABASE_URL
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True,
+                      render_as_batch=url.startswith("sqlite"))
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(conn):
+    context.configure(connection=conn, target_metadata=target_metadata,
+                      render_as_batch=conn.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    if connection is not None:
+        _run(connection)
+        return
+    shard = _shard()
+    target = shard_engines[shard] if shard is not None else engine
+    with target.connect() as conn:
+        _run(conn)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,66 @@
+"""Исходная схема: пользователи, категории, задачи
+
+До миграций схему создавал create_all при старте, поэтому таблицы
+создаются только если их еще нет.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("hashed_password", sa.String(255), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("is_active", sa.Boolean()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "categories" not in tables:
+        op.create_table(
+            "categories",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("color", sa.String(7)),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_categories_id", "categories", ["id"])
+
+    if "tasks" not in tables:
+        op.create_table(
+            "tasks",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("completed", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+            sa.Column("due_date", sa.DateTime(), nullable=True),
+            sa.Column("priority", sa.String(20)),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=True),
+        )
+        op.create_index("ix_tasks_id", "tasks", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("tasks")
+    op.drop_table("categories")
+    op.drop_table("users")
@@ -0,0 +1,55 @@
+"""Отозванные токены и refresh-сессии
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "revoked_tokens" not in tables:
+        op.create_table(
+            "revoked_tokens",
+            sa.Column("jti", sa.String(64), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(), server_default=sa.func.now()),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+
+    if "refresh_tokens" not in tables:
+        op.create_table(
+            "refresh_tokens",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("session_id", sa.String(32), nullable=False),
+            sa.Column("token_hash", sa.String(64), nullable=False),
+            sa.Column("session_started_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("used_at", sa.DateTime(), nullable=True),
+            sa.Column("revoked_at", sa.DateTime(), nullable=True),
+            sa.Column("access_jti", sa.String(64), nullable=True),
+            sa.Column("access_expires_at", sa.DateTime(), nullable=True),
+            sa.Column("user_agent", sa.String(255), nullable=True),
+            sa.Column("ip_address", sa.String(45), nullable=True),
+        )
+        op.create_index("ix_refresh_tokens_id", "refresh_tokens", ["id"])
+        op.create_index("ix_refresh_tokens_user_id", "refresh_tokens", ["user_id"])
+        op.create_index("ix_refresh_tokens_session_id", "refresh_tokens", ["session_id"])
+        op.create_index("ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("refresh_tokens")
+    op.drop_table("revoked_tokens")
@@ -0,0 +1,72 @@
+"""Приоритет для сортировки, индекс агенды, архив задач, справочник шардов
+
+Заменяет upgrade_schema(): priority_rank добавляется в существующую
+таблицу tasks и заполняется из priority.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "priority_rank" not in {column["name"] for column in inspector.get_columns("tasks")}:
+        op.add_column("tasks", sa.Column("priority_rank", sa.Integer()))
+        op.execute(
+            "UPDATE tasks SET priority_rank = CASE priority "
+            "WHEN 'low' THEN 0 WHEN 'high' THEN 2 ELSE 1 END"
+        )
+
+    if "ix_tasks_agenda" not in {index["name"] for index in inspector.get_indexes("tasks")}:
+        op.create_index(
+            "ix_tasks_agenda", "tasks",
+            ["user_id", "completed", "due_date", sa.text("priority_rank DESC")],
+            sqlite_where=sa.text("due_date IS NOT NULL"),
+            postgresql_where=sa.text("due_date IS NOT NULL")
+        )
+
+    if "archived_tasks" not in tables:
+        op.create_table(
+            "archived_tasks",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("task_id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("completed", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True)),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+            sa.Column("due_date", sa.DateTime(), nullable=True),
+            sa.Column("priority", sa.String(20)),
+            sa.Column("priority_rank", sa.Integer()),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=True),
+            sa.Column("archived_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_archived_tasks_user_archived", "archived_tasks", ["user_id", "archived_at"])
+
+    if "user_shards" not in tables:
+        op.create_table(
+            "user_shards",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("shard", sa.Integer(), nullable=False),
+            sa.Column("moving", sa.Boolean(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("user_shards")
+    op.drop_table("archived_tasks")
+    op.drop_index("ix_tasks_agenda", table_name="tasks")
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("priority_rank")
@@ -0,0 +1,31 @@
+"""Индексы по владельцу для tasks и categories
+
+Все выборки задач и категорий фильтруют по user_id, но индекса по нему
+не было: get_tasks и get_stats сканировали всю таблицу. Индекс задач
+составной, чтобы подсчеты по completed в get_stats шли только по индексу.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "ix_tasks_user_completed" not in {index["name"] for index in inspector.get_indexes("tasks")}:
+        op.create_index("ix_tasks_user_completed", "tasks", ["user_id", "completed"])
+    if "ix_categories_user_id" not in {index["name"] for index in inspector.get_indexes("categories")}:
+        op.create_index("ix_categories_user_id", "categories", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_categories_user_id", table_name="categories")
+    op.drop_index("ix_tasks_user_completed", table_name="tasks")
@@ -1,21 +1,95 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index, func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import relationship, sessionmaker, validates
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.exc import IntegrityError
 from core.config import settings
+import hashlib
 import os
 
 # Получаем URL базы данных из переменных окружения
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Важно для SQLite
-)
+def create_db_engine(url: str):
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}  # Важно для SQLite
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=settings.DB_POOL_SIZE or settings.THREADPOOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW
+    )
+
+engine = create_db_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# ========== ШАРДИРОВАНИЕ ==========
+# Пользователи, токены и справочник user_shards живут в основной БД
+# (DATABASE_URL), а задачи и категории - на шарде пользователя.
+# Без SHARD_DATABASE_URLS единственный шард - это основная БД.
+SHARD_URLS = [url.strip() for url in settings.SHARD_DATABASE_URLS.split(",") if url.strip()]
+SHARDING_ENABLED = bool(SHARD_URLS)
+shard_engines = [
+    engine if url == DATABASE_URL else create_db_engine(url) for url in SHARD_URLS
+] or [engine]
+ShardSessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+    for shard_engine in shard_engines
+]
+
+def stable_shard(user_id: int) -> int:
+    """Шард по умолчанию: не зависит от процесса и перезапуска, в отличие от hash()"""
+    digest = hashlib.sha1(str(user_id).encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big") % len(shard_engines)
+
+def mirror_user(shard: int, user):
+    """Копия строки пользователя на шарде, чтобы на нем работали внешние ключи"""
+    if shard_engines[shard] is engine:
+        return
+    shard_db = ShardSessions[shard]()
+    try:
+        if shard_db.get(User, user.id) is None:
+            shard_db.add(User(
+                id=user.id,
+                email=user.email,
+                hashed_password="!",  # пароль проверяется только в основной БД
+                is_active=user.is_active
+            ))
+            shard_db.commit()
+    except IntegrityError:
+        # Копию одновременно создал параллельный запрос
+        shard_db.rollback()
+    finally:
+        shard_db.close()
+
+def assign_shard(db, user):
+    """Записывает пользователя в справочник шардов"""
+    placement = UserShard(user_id=user.id, shard=stable_shard(user.id), moving=False)
+    mirror_user(placement.shard, user)
+    db.add(placement)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Первые запросы пользователя пришли одновременно: запись уже сделал другой
+        db.rollback()
+        placement = db.query(UserShard).filter(UserShard.user_id == user.id).one()
+    return placement
+
+def lock_user_data(db, user_id: int, exclusive: bool = False):
+    """Блокирует строку пользователя на шарде до конца транзакции.
+
+    Запись берет ее разделяемой, перенос между шардами - исключительной.
+    В SQLite блокировок строк нет: пустой UPDATE берет блокировку записи всей БД.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(
+            update(User).where(User.id == user_id).values(id=User.id),
+            execution_options={"synchronize_session": False}
+        )
+    else:
+        db.execute(select(User.id).where(User.id == user_id).with_for_update(read=not exclusive))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -23,8 +97,13 @@ def get_db():
     finally:
         db.close()
 
+PRIORITY_RANKS = {"low": 0, "medium": 1, "high": 2}
+
 class User(Base):
     __tablename__ = "users"
+
+    # Размещение на шарде; заполняет get_current_user, в БД не хранится
+    placement = None
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
@@ -41,7 +120,7 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     color = Column(String(7), default="#667eea")
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     owner = relationship("User", back_populates="categories")
@@ -58,8 +137,87 @@ class Task(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     due_date = Column(DateTime, nullable=True)
     priority = Column(String(20), default="medium")
+    # Числовой приоритет для сортировки в индексе; синхронизируется с priority
+    priority_rank = Column(Integer, default=PRIORITY_RANKS["medium"])
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     
     owner = relationship("User", back_populates="tasks")
-    category = relationship("Category", back_populates="tasks")
\ No newline at end of file
+    category = relationship("Category", back_populates="tasks")
+
+    @validates("priority")
+    def _sync_priority_rank(self, key, value):
+        self.priority_rank = PRIORITY_RANKS.get(value, PRIORITY_RANKS["medium"])
+        return value
+
+# Списки задач и статистика: все выборки идут внутри пользователя
+Index("ix_tasks_user_completed", Task.user_id, Task.completed)
+
+# Агенда (upcoming/overdue): диапазонный скан по due_date внутри пользователя.
+# Задачи без срока в индекс не попадают
+Index(
+    "ix_tasks_agenda",
+    Task.user_id, Task.completed, Task.due_date, Task.priority_rank.desc(),
+    sqlite_where=Task.due_date.isnot(None),
+    postgresql_where=Task.due_date.isnot(None)
+)
+
+class ArchivedTask(Base):
+    """Завершенные задачи, перенесенные из tasks фоновой архивацией"""
+    __tablename__ = "archived_tasks"
+    __table_args__ = (
+        Index("ix_archived_tasks_user_archived", "user_id", "archived_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # id задачи в tasks на момент архивации. Отдельный ключ нужен потому,
+    # что SQLite переиспользует наибольший rowid после удаления строки
+    task_id = Column(Integer, nullable=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text)
+    completed = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    due_date = Column(DateTime, nullable=True)
+    priority = Column(String(20))
+    priority_rank = Column(Integer)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    revoked_at = Column(DateTime, server_default=func.now())
+    # После истечения токен и так невалиден, запись можно удалить
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Все токены одной цепочки ротации относятся к одной сессии
+    session_id = Column(String(32), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    session_started_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+    # Последний выданный вместе с ним access-токен, чтобы отозвать его вместе с сессией
+    access_jti = Column(String(64), nullable=True)
+    access_expires_at = Column(DateTime, nullable=True)
+    user_agent = Column(String(255), nullable=True)
+    ip_address = Column(String(45), nullable=True)
+
+class UserShard(Base):
+    """Справочник шардов: на каком шарде лежат данные пользователя"""
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard = Column(Integer, nullable=False)
+    # Пока данные переносятся между шардами, запросы пользователя получают 503
+    moving = Column(Boolean, default=False, nullable=False)
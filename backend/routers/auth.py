@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from models import get_db, User
-from schemas import UserCreate, UserLogin, Token, UserResponse
-from core.security import verify_password, get_password_hash, create_access_token
+from schemas import UserCreate, UserLogin, Token, UserResponse, RefreshRequest, SessionResponse
+from core.security import verify_password, get_password_hash, verify_token
+from core.revocation import revocation_store
+from core import sessions
+from routers.users import get_current_user, security
 
 router = APIRouter()
 
@@ -23,7 +29,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+def login(user: UserLogin, request: Request, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.email == user.email).first()
     if not db_user or not verify_password(user.password, db_user.hashed_password):
         raise HTTPException(
@@ -31,5 +37,58 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
             detail="Incorrect email or password"
         )
     
-    access_token = create_access_token(data={"sub": db_user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return sessions.issue_tokens(db, db_user, request)
+
+@router.post("/refresh", response_model=Token)
+def refresh(body: RefreshRequest, request: Request, db: Session = Depends(get_db)):
+    return sessions.rotate(db, body.refresh_token, request)
+
+@router.post("/logout")
+def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    payload = verify_token(credentials.credentials)
+    jti = payload.get("jti")
+    if jti:
+        revocation_store.revoke(
+            db,
+            jti=jti,
+            user_id=current_user.id,
+            expires_at=datetime.utcfromtimestamp(payload["exp"])
+        )
+    # Вместе с access-токеном завершаем и его сессию
+    if payload.get("sid"):
+        sessions.revoke_session(db, current_user.id, payload["sid"])
+    return {"message": "Logged out successfully"}
+
+@router.get("/sessions", response_model=List[SessionResponse])
+def get_sessions(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    current_sid = verify_token(credentials.credentials).get("sid")
+    return [
+        SessionResponse(
+            session_id=token.session_id,
+            started_at=token.session_started_at,
+            last_refreshed_at=token.created_at,
+            expires_at=token.expires_at,
+            user_agent=token.user_agent,
+            ip_address=token.ip_address,
+            current=token.session_id == current_sid
+        )
+        for token in sessions.list_sessions(db, current_user.id)
+    ]
+
+@router.delete("/sessions/{session_id}")
+def delete_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not sessions.revoke_session(db, current_user.id, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"message": "Session revoked successfully"}
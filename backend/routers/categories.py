@@ -1,28 +1,38 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List
-from models import get_db, Category, User
+from models import Category, User
 from schemas import CategoryCreate, CategoryResponse
-from routers.users import get_current_user
+from routers.users import get_current_user, get_user_db
+from core.cache import response_cache
 
 router = APIRouter()
 
+CATEGORY_LIST = TypeAdapter(List[CategoryResponse])
+
 @router.post("/", response_model=CategoryResponse)
 def create_category(
     category: CategoryCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     db_category = Category(name=category.name, user_id=current_user.id)
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    response_cache.invalidate(current_user.id, "categories", "dashboard")
     return db_category
 
 @router.get("/", response_model=List[CategoryResponse])
 def get_categories(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
+    cached = response_cache.get(current_user.id, "categories", request)
+    if cached is not None:
+        return cached
+
     categories = db.query(Category).filter(Category.user_id == current_user.id).all()
-    return categories
\ No newline at end of file
+    return response_cache.put(current_user.id, "categories", request, CATEGORY_LIST, categories)
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+from typing import Any, Dict, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.cache import response_cache
+from core.config import settings
+from core.deadlines import DeadlineExceeded
+from metrics import DATABASE_ERRORS, EXCEPTIONS_COUNT
+from models import Category, Task, User
+from routers.tasks import task_stats
+from routers.users import get_current_user, get_user_db
+from schemas import CategoryResponse, DashboardResponse, StatsResponse, TaskResponse
+
+router = APIRouter()
+
+# Разделы ответа и поля, которые можно выбрать в каждом из них
+SECTIONS = {
+    "tasks": list(TaskResponse.model_fields),
+    "stats": list(StatsResponse.model_fields),
+    "categories": list(CategoryResponse.model_fields),
+}
+
+DASHBOARD = TypeAdapter(Dict[str, Any])
+
+
+def parse_fields(fields: Optional[str]) -> Dict[str, Set[str]]:
+    """fields=tasks.id,tasks.title,stats -> {"tasks": {"id", "title"}, "stats": {...все поля}}
+
+    Без fields возвращаются все разделы целиком.
+    """
+    if not fields:
+        return {section: set(names) for section, names in SECTIONS.items()}
+    selected = {}
+    whole = set()
+    for item in fields.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        section, _, field = item.partition(".")
+        if section not in SECTIONS or (field and field not in SECTIONS[section]):
+            raise HTTPException(status_code=400, detail=f"Unknown field: {item}")
+        if field and section not in whole:
+            selected.setdefault(section, set()).add(field)
+        else:
+            whole.add(section)
+            selected[section] = set(SECTIONS[section])
+    return selected
+
+
+def _columns(model, section: str, fields: Set[str]):
+    # Порядок полей как в схеме ответа
+    return [getattr(model, name) for name in SECTIONS[section] if name in fields]
+
+
+def _load_tasks(db: Session, user_id: int, fields: Set[str], completed: Optional[bool],
+                limit: int, offset: int):
+    # Читаем только выбранные колонки, без загрузки ORM-объектов
+    query = db.query(*_columns(Task, "tasks", fields)).filter(Task.user_id == user_id)
+    if completed is not None:
+        query = query.filter(Task.completed == completed)
+    rows = query.order_by(Task.id).offset(offset).limit(limit).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def _load_stats(db: Session, user_id: int, fields: Set[str]):
+    stats = task_stats(db, user_id).model_dump()
+    return {name: value for name, value in stats.items() if name in fields}
+
+
+def _load_categories(db: Session, user_id: int, fields: Set[str]):
+    rows = db.query(*_columns(Category, "categories", fields)).filter(
+        Category.user_id == user_id
+    ).order_by(Category.id).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def _concurrent(db: Session) -> bool:
+    """Параллельные запросы идут на отдельных соединениях; SQLite их
+    все равно выполняет по очереди, там дешевле одна сессия"""
+    return settings.DASHBOARD_CONCURRENT_QUERIES and db.get_bind().dialect.name != "sqlite"
+
+
+def _in_own_session(bind, load, *args):
+    db = Session(bind=bind)
+    try:
+        return load(db, *args)
+    finally:
+        db.close()
+
+
+@router.get("/", response_model=DashboardResponse, response_model_exclude_none=True)
+async def get_dashboard(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Разделы и поля через запятую: tasks.id,tasks.title,stats"),
+    completed: Optional[bool] = None,
+    limit: int = Query(settings.DASHBOARD_PAGE_SIZE, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_db)
+):
+    """Первая страница задач, статистика и категории одним запросом"""
+    selected = parse_fields(fields)
+
+    cached = response_cache.get(current_user.id, "dashboard", request)
+    if cached is not None:
+        return cached
+
+    loads = {}
+    if "tasks" in selected:
+        loads["tasks"] = (_load_tasks, current_user.id, selected["tasks"], completed, limit, offset)
+    if "stats" in selected:
+        loads["stats"] = (_load_stats, current_user.id, selected["stats"])
+    if "categories" in selected:
+        loads["categories"] = (_load_categories, current_user.id, selected["categories"])
+
+    try:
+        if _concurrent(db) and len(loads) > 1:
+            bind = db.get_bind()
+            results = await asyncio.gather(*[
+                run_in_threadpool(_in_own_session, bind, *load) for load in loads.values()
+            ])
+            result = dict(zip(loads, results))
+        else:
+            def load_all():
+                return {section: load(db, *args) for section, (load, *args) in loads.items()}
+
+            result = await run_in_threadpool(load_all)
+        # Сериализация тоже в пуле, чтобы большая страница не держала event loop
+        return await run_in_threadpool(
+            response_cache.put, current_user.id, "dashboard", request, DASHBOARD, result
+        )
+
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        DATABASE_ERRORS.inc()
+        EXCEPTIONS_COUNT.labels(
+            exception_type=type(e).__name__,
+            endpoint="/dashboard"
+        ).inc()
+        raise HTTPException(status_code=500, detail="Internal server error")
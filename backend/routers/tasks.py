@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
+from sqlalchemy import false
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from models import get_db, Task, Category, User
-from schemas import TaskCreate, TaskUpdate, TaskResponse, StatsResponse
-from routers.users import get_current_user
+from models import Task, Category, User, ArchivedTask
+from schemas import TaskCreate, TaskUpdate, TaskResponse, StatsResponse, ArchivedTaskResponse
+from routers.users import get_current_user, get_user_db
 from metrics import TASK_CREATED, TASK_COMPLETED, DATABASE_ERRORS, EXCEPTIONS_COUNT
+from core.cache import response_cache
+from core.deadlines import DeadlineExceeded
 
 router = APIRouter()
 
+# Сериализаторы для ответов, которые кладутся в кеш готовыми байтами
+TASK_LIST = TypeAdapter(List[TaskResponse])
+ARCHIVED_TASK_LIST = TypeAdapter(List[ArchivedTaskResponse])
+STATS = TypeAdapter(StatsResponse)
+
 @router.post("/", response_model=TaskResponse)
 def create_task(
     task: TaskCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     try:
         if task.category_id:
@@ -27,17 +37,20 @@ def create_task(
             title=task.title,
             description=task.description,
             user_id=current_user.id,
-            category_id=task.category_id
+            category_id=task.category_id,
+            due_date=task.due_date,
+            priority=task.priority
         )
         db.add(db_task)
         db.commit()
         db.refresh(db_task)
+        response_cache.invalidate(current_user.id, "tasks", "dashboard")
 
         TASK_CREATED.inc()
         return db_task
         
-    except HTTPException:
-        # Пробрасываем HTTP исключения без логирования как ошибок
+    except (HTTPException, DeadlineExceeded):
+        # Пробрасываем HTTP исключения и дедлайн без логирования как ошибок
         raise
     except Exception as e:
         DATABASE_ERRORS.inc()
@@ -49,11 +62,16 @@ def create_task(
 
 @router.get("/", response_model=List[TaskResponse])
 def get_tasks(
+    request: Request,
     completed: Optional[bool] = None,
     category_id: Optional[int] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
+    cached = response_cache.get(current_user.id, "tasks", request)
+    if cached is not None:
+        return cached
+
     try:
         query = db.query(Task).filter(Task.user_id == current_user.id)
         
@@ -64,8 +82,10 @@ def get_tasks(
             query = query.filter(Task.category_id == category_id)
         
         tasks = query.all()
-        return tasks
+        return response_cache.put(current_user.id, "tasks", request, TASK_LIST, tasks)
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         DATABASE_ERRORS.inc()
         EXCEPTIONS_COUNT.labels(
@@ -74,12 +94,113 @@ def get_tasks(
         ).inc()
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def _agenda_query(db: Session, user_id: int):
+    # Условия совпадают с префиксом и предикатом индекса ix_tasks_agenda
+    return db.query(Task).filter(
+        Task.user_id == user_id,
+        Task.completed == false(),
+        Task.due_date.isnot(None)
+    )
+
+@router.get("/upcoming", response_model=List[TaskResponse])
+def get_upcoming_tasks(
+    request: Request,
+    within: int = Query(7, ge=1, le=365, description="Горизонт в днях"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_db)
+):
+    cached = response_cache.get(current_user.id, "tasks", request)
+    if cached is not None:
+        return cached
+
+    try:
+        now = datetime.utcnow()
+        tasks = _agenda_query(db, current_user.id).filter(
+            Task.due_date >= now,
+            Task.due_date < now + timedelta(days=within)
+        ).order_by(
+            Task.due_date, Task.priority_rank.desc()
+        ).offset(offset).limit(limit).all()
+        return response_cache.put(current_user.id, "tasks", request, TASK_LIST, tasks)
+        
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        DATABASE_ERRORS.inc()
+        EXCEPTIONS_COUNT.labels(
+            exception_type=type(e).__name__,
+            endpoint="/tasks/upcoming"
+        ).inc()
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/overdue", response_model=List[TaskResponse])
+def get_overdue_tasks(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_db)
+):
+    cached = response_cache.get(current_user.id, "tasks", request)
+    if cached is not None:
+        return cached
+
+    try:
+        tasks = _agenda_query(db, current_user.id).filter(
+            Task.due_date < datetime.utcnow()
+        ).order_by(
+            Task.due_date, Task.priority_rank.desc()
+        ).offset(offset).limit(limit).all()
+        return response_cache.put(current_user.id, "tasks", request, TASK_LIST, tasks)
+        
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        DATABASE_ERRORS.inc()
+        EXCEPTIONS_COUNT.labels(
+            exception_type=type(e).__name__,
+            endpoint="/tasks/overdue"
+        ).inc()
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/archive", response_model=List[ArchivedTaskResponse])
+def get_archived_tasks(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_db)
+):
+    cached = response_cache.get(current_user.id, "tasks", request)
+    if cached is not None:
+        return cached
+
+    try:
+        tasks = db.query(ArchivedTask).filter(
+            ArchivedTask.user_id == current_user.id
+        ).order_by(
+            ArchivedTask.archived_at.desc(), ArchivedTask.id.desc()
+        ).offset(offset).limit(limit).all()
+        return response_cache.put(current_user.id, "tasks", request, ARCHIVED_TASK_LIST, tasks)
+        
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        DATABASE_ERRORS.inc()
+        EXCEPTIONS_COUNT.labels(
+            exception_type=type(e).__name__,
+            endpoint="/tasks/archive"
+        ).inc()
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.put("/{task_id}", response_model=TaskResponse)
 def update_task(
     task_id: int,
     task_update: TaskUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     try:
         db_task = db.query(Task).filter(
@@ -106,6 +227,7 @@ def update_task(
         
         db.commit()
         db.refresh(db_task)
+        response_cache.invalidate(current_user.id, "tasks", "dashboard")
         
         # Если задача перешла в статус "завершена", увеличиваем счетчик
         if not was_completed and db_task.completed:
@@ -113,7 +235,7 @@ def update_task(
             
         return db_task
         
-    except HTTPException:
+    except (HTTPException, DeadlineExceeded):
         raise
     except Exception as e:
         DATABASE_ERRORS.inc()
@@ -127,7 +249,7 @@ def update_task(
 def complete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     try:
         db_task = db.query(Task).filter(
@@ -145,9 +267,10 @@ def complete_task(
         db_task.completed = True
         db.commit()
         db.refresh(db_task)
+        response_cache.invalidate(current_user.id, "tasks", "dashboard")
         return db_task
         
-    except HTTPException:
+    except (HTTPException, DeadlineExceeded):
         raise
     except Exception as e:
         DATABASE_ERRORS.inc()
@@ -161,7 +284,7 @@ def complete_task(
 def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
     try:
         db_task = db.query(Task).filter(
@@ -174,9 +297,10 @@ def delete_task(
         
         db.delete(db_task)
         db.commit()
+        response_cache.invalidate(current_user.id, "tasks", "dashboard")
         return {"message": "Task deleted successfully"}
         
-    except HTTPException:
+    except (HTTPException, DeadlineExceeded):
         raise
     except Exception as e:
         DATABASE_ERRORS.inc()
@@ -186,25 +310,42 @@ def delete_task(
         ).inc()
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def task_stats(db: Session, user_id: int) -> StatsResponse:
+    """Счетчики задач пользователя (используется и в /dashboard)"""
+    total_tasks = db.query(Task).filter(Task.user_id == user_id).count()
+    completed_tasks = db.query(Task).filter(
+        Task.user_id == user_id,
+        Task.completed == True
+    ).count()
+    # Архивные задачи все завершены, учитываем их в обоих счетчиках
+    archived_tasks = db.query(ArchivedTask).filter(
+        ArchivedTask.user_id == user_id
+    ).count()
+    total_tasks += archived_tasks
+    completed_tasks += archived_tasks
+
+    return StatsResponse(
+        total_tasks=total_tasks,
+        completed_tasks=completed_tasks,
+        pending_tasks=total_tasks - completed_tasks
+    )
+
 @router.get("/stats", response_model=StatsResponse)
 def get_stats(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_db)
 ):
+    cached = response_cache.get(current_user.id, "tasks", request)
+    if cached is not None:
+        return cached
+
     try:
-        total_tasks = db.query(Task).filter(Task.user_id == current_user.id).count()
-        completed_tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.completed == True
-        ).count()
-        pending_tasks = total_tasks - completed_tasks
-        
-        return StatsResponse(
-            total_tasks=total_tasks,
-            completed_tasks=completed_tasks,
-            pending_tasks=pending_tasks
-        )
+        stats = task_stats(db, current_user.id)
+        return response_cache.put(current_user.id, "tasks", request, STATS, stats)
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         DATABASE_ERRORS.inc()
         EXCEPTIONS_COUNT.labels(
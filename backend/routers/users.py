@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
-from models import get_db, User
+from models import (
+    get_db, User, UserShard, SessionLocal, ShardSessions, SHARDING_ENABLED,
+    assign_shard, engine, lock_user_data, shard_engines
+)
 from schemas import UserResponse
 from core.security import verify_token
+from core.revocation import revocation_store
+from core.tracing import tracer
 
 router = APIRouter()
 security = HTTPBearer()
@@ -16,12 +22,82 @@ async def get_current_user(
     email: str = payload.get("sub")
     if email is None:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    jti = payload.get("jti")
+    if jti and revocation_store.is_revoked(jti, db):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
     
-    user = db.query(User).filter(User.email == email).first()
+    with tracer.span("auth.get_current_user"):
+        if SHARDING_ENABLED:
+            # Шард читаем тем же запросом, что и пользователя
+            row = db.query(User, UserShard).outerjoin(
+                UserShard, UserShard.user_id == User.id
+            ).filter(User.email == email).first()
+            user, placement = row if row else (None, None)
+            if user is not None:
+                user.placement = placement or assign_shard(db, user)
+        else:
+            user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
+def user_moving():
+    return HTTPException(
+        status_code=503,
+        detail="User data is being migrated",
+        headers={"Retry-After": "5"}
+    )
+
+def _check_placement(session, flush_context, instances):
+    """Перед первой записью транзакции на шарде: разделяемая блокировка строки
+    пользователя и повторная проверка справочника.
+
+    Перенос (core.sharding) берет ту же блокировку исключительно, поэтому
+    либо дожидается commit этой транзакции, либо она после него увидит
+    moving или новый шард и получит 503 - запись не попадет на старый шард.
+    """
+    user_id = session.info.get("user_id")
+    transaction = session.get_transaction()
+    if user_id is None or session.info.get("placement_checked") is transaction:
+        return
+    shard = session.info["shard"]
+    lock_user_data(session, user_id)
+    query = select(UserShard.shard, UserShard.moving).where(UserShard.user_id == user_id)
+    if shard_engines[shard] is engine:
+        placement = session.execute(query).first()
+    else:
+        directory = SessionLocal()
+        try:
+            placement = directory.execute(query).first()
+        finally:
+            directory.close()
+    if placement is None or placement.moving or placement.shard != shard:
+        raise user_moving()
+    session.info["placement_checked"] = transaction
+
+for shard_sessions in ShardSessions:
+    event.listen(shard_sessions, "before_flush", _check_placement)
+
+def get_user_db(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Сессия БД, в которой лежат задачи и категории текущего пользователя"""
+    if not SHARDING_ENABLED:
+        yield db
+        return
+
+    placement = current_user.placement
+    if placement.moving:
+        raise user_moving()
+    shard_db = ShardSessions[placement.shard]()
+    shard_db.info.update(user_id=current_user.id, shard=placement.shard)
+    try:
+        yield shard_db
+    finally:
+        shard_db.close()
+
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+    return current_user
@@ -1,8 +1,16 @@
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional
-from datetime import datetime
+from typing import Any, Dict, List, Optional, Literal
+from datetime import datetime, timezone
 import re
 
+Priority = Literal["low", "medium", "high"]
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # В БД даты хранятся без таймзоны, в UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
@@ -34,6 +42,20 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class SessionResponse(BaseModel):
+    session_id: str
+    started_at: datetime
+    last_refreshed_at: datetime
+    expires_at: datetime
+    user_agent: Optional[str]
+    ip_address: Optional[str]
+    current: bool
 
 class CategoryCreate(BaseModel):
     name: str
@@ -51,6 +73,10 @@ class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
     category_id: Optional[int] = None
+    due_date: Optional[datetime] = None
+    priority: Priority = "medium"
+
+    _due_date_utc = validator('due_date', allow_reuse=True)(to_naive_utc)
     
     @validator('title')
     def title_length(cls, v):
@@ -65,6 +91,17 @@ class TaskUpdate(BaseModel):
     description: Optional[str] = None
     completed: Optional[bool] = None
     category_id: Optional[int] = None
+    due_date: Optional[datetime] = None
+    priority: Optional[Priority] = None
+
+    _due_date_utc = validator('due_date', allow_reuse=True)(to_naive_utc)
+
+    @validator('priority')
+    def priority_not_null(cls, v):
+        # Поле можно не передавать, но у задачи всегда есть приоритет
+        if v is None:
+            raise ValueError('Priority cannot be null')
+        return v
 
 class TaskResponse(BaseModel):
     id: int
@@ -73,13 +110,26 @@ class TaskResponse(BaseModel):
     completed: bool
     user_id: int
     category_id: Optional[int]
+    due_date: Optional[datetime] = None
+    priority: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime]
 
     class Config:
         from_attributes = True
 
+class ArchivedTaskResponse(TaskResponse):
+    task_id: int
+    archived_at: datetime
+
 class StatsResponse(BaseModel):
     total_tasks: int
     completed_tasks: int
-    pending_tasks: int
\ No newline at end of file
+    pending_tasks: int
+
+class DashboardResponse(BaseModel):
+    """Разделы, не запрошенные в fields, в ответ не попадают;
+    в задачах и категориях - только выбранные поля"""
+    tasks: Optional[List[Dict[str, Any]]] = None
+    stats: Optional[Dict[str, int]] = None
+    categories: Optional[List[Dict[str, Any]]] = None
\ No newline at end of file
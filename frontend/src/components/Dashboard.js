@@ -1,27 +1,68 @@
 import React, { useState, useEffect } from 'react';
 import { handleApiError, showErrorToast, showSuccessToast } from '../utils/errorHandler';
 
+// Размер страницы задач (DASHBOARD_PAGE_SIZE на backend)
+const PAGE_SIZE = 50;
+// Запрашиваем только отображаемые поля
+const TASK_FIELDS = 'tasks.id,tasks.title,tasks.description,tasks.completed,tasks.created_at';
+const STATS_FIELDS = 'stats.pending_tasks';
+
 const Dashboard = ({ user, onLogout }) => {
   const [tasks, setTasks] = useState([]);
+  const [stats, setStats] = useState(null);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [newTask, setNewTask] = useState({ title: '', description: '' });
 
   useEffect(() => {
     fetchTasks();
   }, []);
 
+  const fetchDashboard = async (fields, offset = 0) => {
+    const token = localStorage.getItem('token');
+    const response = await fetch(`/api/dashboard/?fields=${fields}&limit=${PAGE_SIZE}&offset=${offset}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+    return handleApiError(response);
+  };
+
+  // Первая страница задач и счетчики одним запросом
   const fetchTasks = async () => {
     try {
-      const token = localStorage.getItem('token');
-      const response = await fetch('/api/tasks/', {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
-      const tasksData = await handleApiError(response);
-      setTasks(tasksData);
+      const dashboard = await fetchDashboard(`${TASK_FIELDS},${STATS_FIELDS}`);
+      setTasks(dashboard.tasks);
+      setHasMore(dashboard.tasks.length === PAGE_SIZE);
+      setStats(dashboard.stats);
+    } catch (error) {
+      console.error('Error fetching tasks:', error);
+      showErrorToast('Failed to load tasks');
+    }
+  };
+
+  // Следующая страница дописывается к уже загруженным задачам
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const dashboard = await fetchDashboard(TASK_FIELDS, tasks.length);
+      const loaded = new Set(tasks.map(task => task.id));
+      setTasks([...tasks, ...dashboard.tasks.filter(task => !loaded.has(task.id))]);
+      setHasMore(dashboard.tasks.length === PAGE_SIZE);
     } catch (error) {
       console.error('Error fetching tasks:', error);
       showErrorToast('Failed to load tasks');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const fetchStats = async () => {
+    try {
+      const dashboard = await fetchDashboard(STATS_FIELDS);
+      setStats(dashboard.stats);
+    } catch (error) {
+      console.error('Error fetching stats:', error);
     }
   };
 
@@ -37,9 +78,13 @@ const Dashboard = ({ user, onLogout }) => {
         },
         body: JSON.stringify(newTask)
       });
-      await handleApiError(response);
+      const created = await handleApiError(response);
       setNewTask({ title: '', description: '' });
-      fetchTasks();
+      // Задачи идут по id: новая попадет в список, когда дойдет ее страница
+      if (!hasMore) {
+        setTasks(current => [...current, created]);
+      }
+      fetchStats();
       showSuccessToast('Task created successfully');
     } catch (error) {
       console.error('Error creating task:', error);
@@ -56,8 +101,9 @@ const Dashboard = ({ user, onLogout }) => {
           'Authorization': `Bearer ${token}`
         }
       });
-      await handleApiError(response);
-      fetchTasks();
+      const completed = await handleApiError(response);
+      setTasks(current => current.map(task => (task.id === taskId ? completed : task)));
+      fetchStats();
       showSuccessToast('Task completed');
     } catch (error) {
       console.error('Error completing task:', error);
@@ -75,7 +121,8 @@ const Dashboard = ({ user, onLogout }) => {
         }
       });
       await handleApiError(response);
-      fetchTasks();
+      setTasks(current => current.filter(task => task.id !== taskId));
+      fetchStats();
       showSuccessToast('Task deleted');
     } catch (error) {
       console.error('Error deleting task:', error);
@@ -116,7 +163,8 @@ const Dashboard = ({ user, onLogout }) => {
         </div>
 
         <div className="tasks-list">
-          <h2>Мои задачи ({tasks.length})</h2>
+          <h2>Мои задачи ({tasks.length}{hasMore ? '+' : ''})</h2>
+          {stats && <p>Ожидают выполнения: {stats.pending_tasks}</p>}
           {tasks.length === 0 ? (
             <div className="empty-state">
               <p>Задач пока нет</p>
@@ -155,6 +203,11 @@ const Dashboard = ({ user, onLogout }) => {
               ))}
             </div>
           )}
+          {hasMore && (
+            <button onClick={loadMore} className="btn-primary" disabled={loadingMore}>
+              {loadingMore ? 'Загрузка...' : 'Показать еще'}
+            </button>
+          )}
         </div>
       </div>
     </div>